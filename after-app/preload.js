@@ -4,6 +4,8 @@ const path = require('path');
 
 const sessionsDir = path.join(__dirname, 'sessions');
 
+const TIMELINE_DTYPES = { float32: Float32Array, uint32: Uint32Array };
+
 if (!fs.existsSync(sessionsDir)) {
   fs.mkdirSync(sessionsDir, { recursive: true });
 }
@@ -37,7 +39,7 @@ contextBridge.exposeInMainWorld('api', {
     }
   },
 
-  createSession: (sessionName, videoData, audioData) => {
+  createSession: (sessionName, videoData, audioData, durationSeconds) => {
     const sessionPath = path.join(sessionsDir, sessionName);
     fs.mkdirSync(sessionPath, { recursive: true });
 
@@ -53,6 +55,9 @@ contextBridge.exposeInMainWorld('api', {
       processed_frames: 0,
       created_at: new Date().toISOString()
     };
+    if (durationSeconds > 0) {
+      job.recorded_duration = Math.round(durationSeconds * 100) / 100;
+    }
     fs.writeFileSync(path.join(sessionPath, 'job.json'), JSON.stringify(job, null, 2));
 
     return sessionPath;
@@ -76,6 +81,41 @@ contextBridge.exposeInMainWorld('api', {
       console.error('Failed to read analytics:', err);
       return null;
     }
+  },
+
+  // timeline.bin (see python/timeline_file.py): level 0 is full resolution,
+  // level k the k-th min/max downsample. Only the requested columns are read.
+  readTimeline: (sessionName, { level = 0, columns = null } = {}) => {
+    try {
+      const timelinePath = path.join(sessionsDir, sessionName, 'timeline.bin');
+      if (!fs.existsSync(timelinePath)) return null;
+      const fd = fs.openSync(timelinePath, 'r');
+      try {
+        const prefix = Buffer.alloc(8);
+        fs.readSync(fd, prefix, 0, 8, 0);
+        if (prefix.toString('ascii', 0, 4) !== 'SBTL') {
+          throw new Error('not a timeline file');
+        }
+        const headerBuffer = Buffer.alloc(prefix.readUInt32LE(4));
+        fs.readSync(fd, headerBuffer, 0, headerBuffer.length, 8);
+        const header = JSON.parse(headerBuffer.toString('utf-8'));
+
+        const source = level === 0 ? header : header.levels[level - 1];
+        const data = {};
+        for (const [name, column] of Object.entries(source.columns)) {
+          if (columns && !columns.includes(name)) continue;
+          const array = new TIMELINE_DTYPES[column.dtype](column.length);
+          fs.readSync(fd, new Uint8Array(array.buffer), 0, array.byteLength, column.offset);
+          data[name] = array;
+        }
+        return { header, level, factor: source.factor || 1, length: source.length, columns: data };
+      } finally {
+        fs.closeSync(fd);
+      }
+    } catch (err) {
+      console.error('Failed to read timeline:', err);
+      return null;
+    }
   }
 });
 
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Throughput Benchmark
+Runs worker.py and the prototype pipeline-sobel-fpga/src/main.py (duplex role)
+against a PtyFPGA stand-in board and reports frames/s, per-frame latency
+percentiles and CPU use, so throughput regressions show up without hardware.
+"""
+
+import sys
+import json
+import time
+import shlex
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+import cv2
+import numpy as np
+from pathlib import Path
+
+from fpga_pty_emulator import PtyFPGA, BAUD_RATE
+from worker import verification_frame
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+WORKER = SCRIPT_DIR / "worker.py"
+PROTOTYPE_MAIN = SCRIPT_DIR.parent.parent / "pipeline-sobel-fpga" / "src" / "main.py"
+TARGETS = ('worker', 'prototype')
+PERCENTILES = (50, 90, 99)
+
+
+def make_clip(path, frames, width=320, height=240, fps=30):
+    """Synthetic recording: a bright disc swinging left and right."""
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'VP80'), fps, (width, height))
+    for i in range(frames):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        x = int(width / 2 + width / 3 * np.sin(i * 0.2))
+        cv2.circle(frame, (x, height // 2), height // 6, (255, 255, 255), -1)
+        out.write(frame)
+    out.release()
+
+
+def worker_command(device, workdir, video, extra_args=()):
+    session = workdir / "sessions" / "benchmark"
+    session.mkdir(parents=True)
+    shutil.copy(video, session / "original.webm")
+    with open(session / "job.json", 'w') as f:
+        json.dump({'status': 'pending', 'total_frames': 0, 'processed_frames': 0}, f)
+    return [sys.executable, str(WORKER), "--backend", "fpga", "--port", device.port,
+            "--sessions-dir", str(workdir / "sessions"), "--once", "--jobs", "1",
+            "--cache-size", "0", "--no-checkpoint", *extra_args]
+
+
+def prototype_command(device, workdir, video, extra_args=()):
+    return [sys.executable, str(PROTOTYPE_MAIN), "--role", "duplex", "--port", device.port,
+            "--video", str(video), "--skip-frames", "1", "--cache-size", "0", *extra_args]
+
+
+def run_target(name, device, workdir, video, extra_args=()):
+    """Run one client against the device; returns its report."""
+    command = worker_command if name == 'worker' else prototype_command
+    cmd = command(device, workdir, video, extra_args)
+    log_path = workdir / f"{name}.log"
+
+    cpu_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.monotonic()
+    with open(log_path, 'w') as log:
+        returncode = subprocess.run(cmd, cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+                                    stdin=subprocess.DEVNULL).returncode
+    wall = time.monotonic() - start
+    cpu_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+    if returncode != 0:
+        print(f"{name} exited with {returncode}:")
+        print("".join(log_path.read_text().splitlines(keepends=True)[-20:]))
+
+    return summarize(name, device, wall, cpu, returncode, log_path)
+
+
+def summarize(name, device, wall, cpu, returncode, log_path):
+    frames = np.array(device.frames) if device.frames else np.zeros((0, 3))
+    report = {
+        'target': name,
+        'returncode': returncode,
+        'log': str(log_path),
+        'frames': len(frames),
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'cpu_percent': round(100 * cpu / wall, 1) if wall > 0 else 0,
+        'lost_bytes': device.lost_bytes,
+    }
+    if len(frames) == 0:
+        return report
+
+    # Latency: first byte in -> last byte of the answer out (as seen by the board).
+    latency = frames[:, 2] - frames[:, 0]
+    # Host turnaround: answer fully sent -> first byte of the next frame.
+    turnaround = frames[1:, 0] - frames[:-1, 2]
+    active = frames[-1, 2] - frames[0, 0]
+
+    report['fps'] = round(len(frames) / active, 3) if active > 0 else None
+    report['fps_wall'] = round(len(frames) / wall, 3)
+    report['latency_ms'] = {f'p{p}': round(float(np.percentile(latency, p)) * 1000, 1)
+                            for p in PERCENTILES}
+    if len(turnaround):
+        report['turnaround_ms'] = {f'p{p}': round(float(np.percentile(turnaround, p)) * 1000, 1)
+                                   for p in PERCENTILES}
+    return report
+
+
+def print_report(report):
+    print(f"\n[{report['target']}] exit {report['returncode']} (log: {report['log']})")
+    print(f"  frames:      {report['frames']} in {report['wall_seconds']} s")
+    if report['frames']:
+        print(f"  throughput:  {report['fps']} frames/s on the link, {report['fps_wall']} end to end")
+        print(f"  latency:     " + ", ".join(f"{k} {v} ms" for k, v in report['latency_ms'].items()))
+        if 'turnaround_ms' in report:
+            print(f"  turnaround:  " + ", ".join(f"{k} {v} ms" for k, v in report['turnaround_ms'].items()))
+    print(f"  CPU:         {report['cpu_seconds']} s ({report['cpu_percent']}% of one core)")
+    if report['lost_bytes']:
+        print(f"  lost bytes:  {report['lost_bytes']} (sent while the board was busy)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker.py / main.py against an emulated board")
+    parser.add_argument("--target", choices=TARGETS + ('both',), default='both')
+    parser.add_argument("--video", type=Path, help="Input recording (default: a synthetic clip).")
+    parser.add_argument("--frames", type=int, default=30, help="Length of the synthetic clip.")
+    parser.add_argument("--no-throttle", action="store_true",
+                        help="Let the board answer instantly instead of at 115200 8N1 timing.")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--delay-rate", type=float, default=0.0)
+    parser.add_argument("--delay", type=float, default=6.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker-args", default="",
+                        help="Extra options for worker.py, e.g. \"--motion-threshold 2\".")
+    parser.add_argument("--prototype-args", default="", help="Extra options for main.py.")
+    parser.add_argument("--json", type=Path, help="Also write the reports to this file.")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory.")
+    args = parser.parse_args()
+
+    targets = TARGETS if args.target == 'both' else (args.target,)
+    workroot = Path(tempfile.mkdtemp(prefix="sobel-bench-"))
+    video = args.video
+    if video is None:
+        video = workroot / "clip.webm"
+        make_clip(video, args.frames)
+
+    reports = []
+    try:
+        for name in targets:
+            workdir = workroot / name
+            workdir.mkdir()
+            # The worker checks the board with a verification frame (and any
+            # resync it needs) before the session; only what follows is measured.
+            device = PtyFPGA(throttle=not args.no_throttle, baud=args.baud, drop_rate=args.drop_rate,
+                             delay_rate=args.delay_rate, delay=args.delay, seed=args.seed,
+                             record_after=verification_frame() if name == 'worker' else None)
+            try:
+                print(f"Running {name} against {device.port}...")
+                extra_args = shlex.split(args.worker_args if name == 'worker' else args.prototype_args)
+                reports.append(run_target(name, device, workdir, video.absolute(), extra_args))
+            finally:
+                device.close()
+            print_report(reports[-1])
+    finally:
+        if not args.keep:
+            shutil.rmtree(workroot, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Decoder Check
+Guards the claim that --decoder ffmpeg feeds the board the same frames as the
+default OpenCV decoder: decodes one recording both ways, through the
+worker's own open_video()/frame_to_fpga_format(), and compares the 160x120
+grey inputs frame by frame, plus the timestamps each decoder reports.
+
+The two scalers are not bit-identical (ffmpeg's bilinear vs cv2.resize), so
+small per-pixel differences are expected; a luma range mismatch (limited
+16-235 against OpenCV's full 0-255) or a dropped/duplicated frame shows up as
+a mean bias, a frame count or a timestamp difference, and fails the check.
+
+Exits non-zero on any mismatch; run it after touching ffmpeg_capture.py or
+on a new ffmpeg build.
+"""
+
+import sys
+import argparse
+import cv2
+import numpy as np
+
+# worker goes first: it puts fpga_link/ (repository root) on sys.path for the other modules.
+from worker import JobProcessor
+from ffmpeg_capture import ffmpeg_available
+from sobel_emulator import FPGA_WIDTH, FPGA_HEIGHT
+
+# Grey levels: mean |difference| per frame, and mean signed difference over the clip.
+MAX_FRAME_DIFFERENCE = 3.0
+MAX_BIAS = 1.0
+
+
+def decode(video_path, decoder):
+    """The board inputs and timestamps (ms) the worker gets with `decoder`."""
+    processor = JobProcessor(backend='emulator', checkpoint=False, decoder=decoder)
+    try:
+        _, _, fps, _ = processor.get_video_info(video_path)
+        cap = processor.open_video(video_path, fps)
+        frames, timestamps = [], []
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(np.frombuffer(processor.frame_to_fpga_format(frame), dtype=np.uint8))
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        finally:
+            cap.release()
+    finally:
+        processor.close()
+    return fps, np.array(frames).reshape(-1, FPGA_HEIGHT, FPGA_WIDTH), np.array(timestamps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the ffmpeg decoder gives the board the same "
+                                                 "frames as the OpenCV decoder")
+    parser.add_argument("video", help="Recording to decode (e.g. a session's original.webm).")
+    args = parser.parse_args()
+
+    if not ffmpeg_available():
+        # The worker falls back to OpenCV too, so there is nothing to compare.
+        print("ffmpeg not found; the worker decodes with OpenCV only")
+        return
+
+    fps, expected, expected_ms = decode(args.video, 'opencv')
+    _, actual, actual_ms = decode(args.video, 'ffmpeg')
+    ok = True
+
+    if len(actual) != len(expected):
+        print(f"frames: ffmpeg decoded {len(actual)}, OpenCV {len(expected)}")
+        ok = False
+    else:
+        print(f"frames: {len(actual)}: OK")
+    count = min(len(actual), len(expected))
+    if count == 0:
+        sys.exit(1)
+
+    difference = actual[:count].astype(np.int16) - expected[:count]
+    per_frame = np.abs(difference).mean(axis=(1, 2))
+    worst = int(np.argmax(per_frame))
+    bias = float(difference.mean())
+    label = (f"pixels: mean |difference| {per_frame.mean():.2f}, worst frame {worst} {per_frame[worst]:.2f}, "
+             f"bias {bias:+.2f}; range ffmpeg {actual.min()}-{actual.max()}, "
+             f"OpenCV {expected.min()}-{expected.max()}")
+    if per_frame[worst] > MAX_FRAME_DIFFERENCE or abs(bias) > MAX_BIAS:
+        print(f"{label}: FAILED")
+        ok = False
+    else:
+        print(f"{label}: OK")
+
+    # Half a frame interval: showinfo prints pts_time with 6 significant digits.
+    tolerance = 500.0 / fps
+    drift = np.abs(actual_ms[:count] - expected_ms[:count])
+    worst = int(np.argmax(drift))
+    label = f"timestamps: worst frame {worst}, {actual_ms[worst]:.1f} ms vs {expected_ms[worst]:.1f} ms"
+    if drift[worst] > tolerance:
+        print(f"{label}: FAILED")
+        ok = False
+    else:
+        print(f"{label}: OK")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Sobel Model Check
+Guards the claim that sobel_emulator.sobel_frame is bit-exact with the board:
+compares it against a cycle-by-cycle model of kernel_sobel.v as wired in
+sobel_processing_unit_fd.v (registered buffer_raw read port, line buffers,
+3x3 shift window, output coordinate counters, registered pixel_pronto into
+buffer_sobel). The cycle model starts from garbage line buffers, window and
+stale read-port byte, like the board after a previous frame.
+
+It also checks that tiling (sobel_tiling.py) is seamless: frames split into
+tiles, run through the emulator and stitched must equal a direct full-frame
+Sobel with the outer border zeroed, including frames where unchanged tiles
+are not resent.
+
+Exits non-zero on any mismatch; run it after touching sobel_emulator.py or
+sobel_tiling.py.
+"""
+
+import sys
+import argparse
+import numpy as np
+
+from sobel_emulator import sobel_frame, FPGA_WIDTH, FPGA_HEIGHT, FRAME_SIZE, LATENCY
+from sobel_tiling import SobelTiler, UNCHANGED
+
+TILED_SIZES = ((320, 240), (200, 150))
+
+
+def kernel_cycle_model(frame_bytes, rng):
+    """One frame through kernel_sobel.v, one loop iteration per clock in `processa`."""
+    pixels = list(frame_bytes)
+    width, total = FPGA_WIDTH, FRAME_SIZE
+
+    # Registers the board does not reset between frames.
+    line_0 = [int(v) for v in rng.integers(0, 256, width)]
+    line_1 = [int(v) for v in rng.integers(0, 256, width)]
+    w = [[int(v) for v in row] for row in rng.integers(0, 256, (3, 3))]
+    # buffer_raw's data_out still holds the byte read on the last rx write.
+    data_out = int(rng.integers(0, 256))
+
+    raw_addr = 0
+    pixels_read = shifts = x_ptr = 0
+    row_out = col_out = 0
+    pixel_pronto = False
+    sobel_addr = 0
+    out = bytearray(total)
+
+    while sobel_addr < total:
+        # Combinational logic of this cycle.
+        shifting = shifts < total + LATENCY
+        read = shifting and pixels_read < total
+        pixel_in = data_out if read else 0
+        if row_out in (0, FPGA_HEIGHT - 1) or col_out in (0, width - 1):
+            pixel_out = 0
+        else:
+            gx = (w[0][2] + 2 * w[1][2] + w[2][2]) - (w[0][0] + 2 * w[1][0] + w[2][0])
+            gy = (w[0][0] + 2 * w[0][1] + w[0][2]) - (w[2][0] + 2 * w[2][1] + w[2][2])
+            pixel_out = min(abs(gx) + abs(gy), 255)
+
+        # Clock edge: every register takes its next value at once.
+        if pixel_pronto:
+            out[sobel_addr] = pixel_out
+            sobel_addr += 1
+        data_out = pixels[raw_addr]
+        if read:
+            raw_addr = (raw_addr + 1) % total
+            pixels_read += 1
+        pixel_pronto = shifting and shifts >= LATENCY
+        if pixel_pronto:
+            if col_out == width - 1:
+                col_out, row_out = 0, row_out + 1
+            else:
+                col_out += 1
+        if shifting:
+            shifts += 1
+            w = [[w[0][1], w[0][2], line_0[x_ptr]],
+                 [w[1][1], w[1][2], line_1[x_ptr]],
+                 [w[2][1], w[2][2], pixel_in]]
+            line_0[x_ptr], line_1[x_ptr] = line_1[x_ptr], pixel_in
+            x_ptr = (x_ptr + 1) % width
+    return bytes(out)
+
+
+def test_frames(count, rng):
+    """Noise, saturating edges and flat frames, as 160x120 grayscale bytes."""
+    rows, cols = np.indices((FPGA_HEIGHT, FPGA_WIDTH))
+    yield "stripes", (((rows + cols) * 8) % 256).astype(np.uint8).tobytes()
+    yield "checker", (((rows // 4 + cols // 4) % 2) * 255).astype(np.uint8).tobytes()
+    yield "flat", np.full((FPGA_HEIGHT, FPGA_WIDTH), 200, dtype=np.uint8).tobytes()
+    for i in range(count):
+        yield f"noise {i}", rng.integers(0, 256, FRAME_SIZE, dtype=np.uint8).tobytes()
+
+
+def check_emulator(count, rng):
+    ok = True
+    for name, frame in test_frames(count, rng):
+        expected = np.frombuffer(kernel_cycle_model(frame, rng), dtype=np.uint8)
+        actual = np.frombuffer(sobel_frame(frame), dtype=np.uint8)
+        bad = np.flatnonzero(expected != actual)
+        if bad.size:
+            row, col = divmod(int(bad[0]), FPGA_WIDTH)
+            print(f"emulator: {name}: {bad.size} byte(s) differ from kernel_sobel.v, "
+                  f"first at ({row}, {col}): {actual[bad[0]]} != {expected[bad[0]]}")
+            ok = False
+        else:
+            print(f"emulator: {name}: OK")
+    return ok
+
+
+def full_frame_sobel(gray):
+    """|Gx| + |Gy| clamped to 255 of every full 3x3 window, 0 on the outer border."""
+    g = gray.astype(np.int32)
+    height, width = g.shape
+    w = [[g[dy:height - 2 + dy, dx:width - 2 + dx] for dx in range(3)] for dy in range(3)]
+    gx = (w[0][2] + 2 * w[1][2] + w[2][2]) - (w[0][0] + 2 * w[1][0] + w[2][0])
+    gy = (w[0][0] + 2 * w[0][1] + w[0][2]) - (w[2][0] + 2 * w[2][1] + w[2][2])
+    out = np.zeros((height, width), dtype=np.uint8)
+    out[1:-1, 1:-1] = np.minimum(np.abs(gx) + np.abs(gy), 255)
+    return out
+
+
+def tiled_frames(width, height, rng):
+    """Noise, then the same noise with a patch changed (most tiles unchanged), then flat."""
+    frame = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    yield "noise", frame
+    changed = frame.copy()
+    changed[height // 3:height // 3 + 20, width // 2:width // 2 + 30] = rng.integers(0, 256, (20, 30))
+    yield "patch", changed
+    yield "flat", np.full((height, width), 90, dtype=np.uint8)
+
+
+def check_tiling(rng):
+    ok = True
+    for width, height in TILED_SIZES:
+        tiler = SobelTiler(width, height)
+        for name, frame in tiled_frames(width, height, rng):
+            inputs = tiler.split(frame)
+            results = [tile if tile is UNCHANGED else sobel_frame(tile) for tile in inputs]
+            actual = np.frombuffer(tiler.stitch(results), dtype=np.uint8).reshape(height, width)
+            expected = full_frame_sobel(frame)
+            skipped = sum(tile is UNCHANGED for tile in inputs)
+            label = f"tiling {width}x{height}: {name} ({skipped} of {len(inputs)} tiles unchanged)"
+            bad = np.argwhere(expected != actual)
+            if bad.size:
+                row, col = bad[0]
+                print(f"{label}: {len(bad)} pixel(s) differ from the full-frame Sobel, "
+                      f"first at ({row}, {col}): {actual[row, col]} != {expected[row, col]}")
+                ok = False
+            else:
+                print(f"{label}: OK")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the Sobel emulator against a cycle model of the board, "
+                                                 "and tiling against a full-frame Sobel")
+    parser.add_argument("--frames", type=int, default=3, help="Random frames checked besides the fixed ones.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ok = check_emulator(args.frames, rng)
+    ok = check_tiling(rng) and ok
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+FFmpeg Capture
+cv2.VideoCapture stand-in that decodes a recording with a local ffmpeg
+process straight to the board's 160x120 grayscale. ffmpeg decodes on several
+threads and scales/converts inside the decoder process (luma only, expanded to
+full range like OpenCV's gray; no BGR frame is ever built), and the raw frames
+are read from its stdout pipe into one reused NumPy buffer, so the worker's
+decode stage only waits on a pipe.
+
+read() returns that buffer: it is overwritten by the next read()/grab().
+CAP_PROP_POS_MSEC is the frame's real presentation time: recordings from the
+browser's MediaRecorder are variable frame rate, so it cannot be derived from
+the container's frame rate. A showinfo filter logs each frame's pts_time on
+stderr before the frame reaches stdout; the stderr thread queues them and each
+read()/grab() takes the next one (frames are passed through without
+duplication or dropping, so they pair up one to one).
+"""
+
+import re
+import shutil
+import subprocess
+import threading
+from collections import deque
+import cv2
+import numpy as np
+
+FRAME_WIDTH, FRAME_HEIGHT = 160, 120
+
+# "[Parsed_showinfo_2 @ 0x...] n:   0 pts:      0 pts_time:0  ..."
+SHOWINFO_PTS = re.compile(rb'Parsed_showinfo.*\bn:\s*\d+\s+pts:\s*\S+\s+pts_time:(\S+)')
+# How long a frame waits for its pts line before falling back to the frame rate.
+PTS_TIMEOUT = 2.0
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None
+
+
+class FFmpegCapture:
+    def __init__(self, path, fps, size=(FRAME_WIDTH, FRAME_HEIGHT), threads=0):
+        self.path = str(path)
+        self.fps = fps
+        self.width, self.height = size
+        self.buffer = np.empty((self.height, self.width), dtype=np.uint8)
+        self.view = memoryview(self.buffer).cast('B')
+        self.frames = 0
+        self.position_ms = 0.0
+        self.stderr_tail = b''
+        self.pts = deque()
+        self.pts_ready = threading.Condition()
+        self.stderr_done = False
+
+        # The scaler expands the recording's limited-range luma (16-235) to full
+        # range, as OpenCV's BGR2GRAY sees it. showinfo logs at info level; it
+        # runs after scaling, so its per-frame checksum only covers 160x120 bytes.
+        cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "info", "-nostdin",
+               "-threads", str(threads), "-i", self.path, "-an", "-sn",
+               "-vf", f"scale={self.width}:{self.height}:flags=bilinear:out_range=full,format=gray,showinfo",
+               "-fps_mode", "passthrough", "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1"]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, bufsize=0)
+        # Drain stderr so ffmpeg never blocks on it: frame pts go to self.pts,
+        # the end of everything else is kept for errors.
+        self.stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self.stderr_thread.start()
+
+    def _drain_stderr(self):
+        for line in self.proc.stderr:
+            match = SHOWINFO_PTS.search(line)
+            if match is None:
+                self.stderr_tail = (self.stderr_tail + line)[-2048:]
+                continue
+            try:
+                pts_ms = float(match.group(1)) * 1000.0
+            except ValueError:
+                pts_ms = None  # NOPTS
+            with self.pts_ready:
+                self.pts.append(pts_ms)
+                self.pts_ready.notify()
+        with self.pts_ready:
+            self.stderr_done = True
+            self.pts_ready.notify()
+
+    def _next_pts(self):
+        """Presentation time (ms) of the frame just read."""
+        with self.pts_ready:
+            self.pts_ready.wait_for(lambda: self.pts or self.stderr_done, PTS_TIMEOUT)
+            pts_ms = self.pts.popleft() if self.pts else None
+        if pts_ms is None:
+            pts_ms = (self.frames - 1) * 1000.0 / self.fps
+        return pts_ms
+
+    def isOpened(self):
+        return self.proc.poll() is None or self.frames > 0
+
+    def _read_frame(self):
+        filled = 0
+        size = len(self.view)
+        while filled < size:
+            n = self.proc.stdout.readinto(self.view[filled:])
+            if not n:
+                if filled:
+                    print(f"ffmpeg: truncated frame after {self.frames} frames")
+                if self.proc.wait() != 0:
+                    print(f"ffmpeg exited with {self.proc.returncode}: "
+                          f"{self.stderr_tail.decode(errors='replace').strip()}")
+                return False
+            filled += n
+        self.frames += 1
+        self.position_ms = self._next_pts()
+        return True
+
+    def grab(self):
+        return self._read_frame()
+
+    def read(self):
+        if not self._read_frame():
+            return False, None
+        return True, self.buffer
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.position_ms
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def release(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdout.close()
+        self.stderr_thread.join()
+        self.proc.stderr.close()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+PTY FPGA Emulator
+A pseudo-terminal that serial.Serial can open in place of the DE10-Lite. It
+follows the sobel_uc.v FSM: receive 19200 bytes, compute the frame with the
+bit-exact model in sobel_emulator.py, transmit the 19200-byte result, then go
+back to receiving. Bytes that arrive while processing/transmitting are lost,
+as on the board. Optionally paces both directions at real UART byte timing
+and injects dropped bytes or stalled frames.
+
+With record_after, exchanges are only recorded in `frames` once that input
+frame (e.g. the worker's verification frame) has been answered, so a client's
+connection check is not counted as work.
+"""
+
+import os
+import pty
+import tty
+import time
+import random
+import select
+import argparse
+import threading
+
+from sobel_emulator import sobel_frame, FRAME_SIZE
+
+BAUD_RATE = 115200
+BITS_PER_BYTE = 10  # 8N1: start + 8 data + stop
+
+# Bytes moved per read/write while pacing (~22 ms of line time at 115200).
+LINE_CHUNK = 256
+
+
+class PtyFPGA:
+    """Emulated board behind a pty. `port` is the path to hand to serial.Serial."""
+
+    def __init__(self, throttle=True, baud=BAUD_RATE, drop_rate=0.0, delay_rate=0.0,
+                 delay=0.0, seed=None, record_after=None):
+        self.byte_time = BITS_PER_BYTE / baud if throttle else 0.0
+        self.drop_rate = drop_rate
+        self.delay_rate = delay_rate
+        self.delay = delay
+        self.rng = random.Random(seed)
+
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+        # (rx_start, rx_end, tx_end) per frame, time.monotonic() seconds.
+        self.frames = []
+        self.record_after = record_after
+        self.recording = record_after is None
+        self.skipped_frames = 0
+        self.injected_drops = 0
+        self.injected_delays = 0
+        self.lost_bytes = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        frame = bytearray()
+        rx_start = None
+        clock = 0.0
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                continue
+            clock = max(clock, time.monotonic())
+            try:
+                data = os.read(self.master, LINE_CHUNK)
+            except OSError:
+                return
+            clock = self._wait_line(clock, len(data))
+
+            if self.drop_rate:
+                kept = bytes(b for b in data if self.rng.random() >= self.drop_rate)
+                self.injected_drops += len(data) - len(kept)
+                data = kept
+            if not data:
+                continue
+
+            if rx_start is None:
+                rx_start = clock - len(data) * self.byte_time
+            take = FRAME_SIZE - len(frame)
+            frame += data[:take]
+            # Anything past the frame arrives while the FSM is in processa: lost.
+            self.lost_bytes += max(0, len(data) - take)
+            if len(frame) < FRAME_SIZE:
+                continue
+
+            rx_end = time.monotonic()
+            received = bytes(frame)
+            result = sobel_frame(received)
+            frame.clear()
+
+            if self.delay_rate and self.rng.random() < self.delay_rate:
+                self.injected_delays += 1
+                self._discard_for(self.delay)
+            tx_end = self._transmit(result)
+            if tx_end is None:
+                return
+            if self.recording:
+                self.frames.append((rx_start, rx_end, tx_end))
+            else:
+                self.skipped_frames += 1
+                self.recording = received == self.record_after
+            rx_start = None
+            clock = tx_end
+
+    def _wait_line(self, start, nbytes):
+        """Sleep until `nbytes` starting at `start` would have crossed the line."""
+        end = start + nbytes * self.byte_time
+        remaining = end - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        return end
+
+    def _discard_for(self, seconds):
+        """RX is disabled outside recebe: drop what the host sends meanwhile.
+        At line rate only the bytes that would have arrived in time are lost."""
+        end = time.monotonic() + seconds
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            ready, _, _ = select.select([self.master], [], [], remaining)
+            if not ready:
+                continue
+            want = LINE_CHUNK
+            if self.byte_time:
+                want = max(1, min(want, int(remaining / self.byte_time)))
+            try:
+                data = os.read(self.master, want)
+            except OSError:
+                return
+            self.lost_bytes += len(data)
+            self._wait_line(time.monotonic(), len(data))
+
+    def _transmit(self, result):
+        for offset in range(0, len(result), LINE_CHUNK):
+            chunk = result[offset:offset + LINE_CHUNK]
+            # A chunk reaches the host once it has crossed the line.
+            self._discard_for(len(chunk) * self.byte_time)
+            try:
+                os.write(self.master, chunk)
+            except OSError:
+                return None
+        return time.monotonic()
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTY stand-in for the DE10-Lite Sobel board")
+    parser.add_argument("--no-throttle", action="store_true",
+                        help="Answer as fast as possible instead of at UART byte timing.")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Probability of losing each received byte.")
+    parser.add_argument("--delay-rate", type=float, default=0.0,
+                        help="Probability of stalling a frame before transmitting it.")
+    parser.add_argument("--delay", type=float, default=6.0, help="Stall length in seconds.")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    device = PtyFPGA(throttle=not args.no_throttle, baud=args.baud, drop_rate=args.drop_rate,
+                     delay_rate=args.delay_rate, delay=args.delay, seed=args.seed)
+    print(f"Emulated FPGA on {device.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.close()
+    print(f"\n{len(device.frames)} frames, {device.lost_bytes} bytes lost, "
+          f"{device.injected_drops} dropped, {device.injected_delays} stalls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Live Capture
+cv2.VideoCapture stand-in for processing a camera (or a v4l2loopback device
+such as the video-feed-stub output) in real time. A reader thread keeps only
+the newest frame; read() hands out at most `fps` frames per second and always
+the most recent one, so frames the pipeline could not take in time are
+dropped instead of queueing up and latency stays bounded.
+
+The frames actually handed out are also recorded to a video file, which
+becomes the session's original.webm.
+"""
+
+import time
+import threading
+import cv2
+
+
+def open_source(source):
+    """Camera index ("0") or device path ("/dev/video2")."""
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else str(source))
+
+
+class LiveCapture:
+    def __init__(self, source, fps, record_path=None):
+        self.source = source
+        self.fps = fps
+        self.cap = open_source(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video source {source}")
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        self.recorder = None
+        if record_path is not None:
+            self.recorder = cv2.VideoWriter(str(record_path), cv2.VideoWriter_fourcc(*'VP80'),
+                                            fps, (self.width, self.height))
+
+        self.cond = threading.Condition()
+        self.frame = None
+        self.frame_time = None
+        self.sequence = 0        # frames read from the device
+        self.returned_sequence = 0
+        self.stopped = False
+
+        self.started = time.monotonic()
+        self.next_due = self.started
+        self.position_ms = 0.0   # capture time of the last frame returned
+        self.frames_returned = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+        self.thread = threading.Thread(target=self._capture, daemon=True)
+        self.thread.start()
+
+    def _capture(self):
+        while not self.stopped:
+            ret, frame = self.cap.read()
+            now = time.monotonic()
+            with self.cond:
+                if not ret:
+                    print(f"Live source {self.source} stopped delivering frames")
+                    self.stopped = True
+                else:
+                    self.frame = frame
+                    self.frame_time = now
+                    self.sequence += 1
+                self.cond.notify_all()
+
+    def read(self):
+        """Newest frame not returned before, no sooner than the next 1/fps tick.
+        Returns (False, None) once stopped."""
+        delay = self.next_due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        with self.cond:
+            # Timed waits so stop() (which cannot notify from a signal handler) is seen.
+            while not self.cond.wait_for(lambda: self.stopped or self.sequence > self.returned_sequence,
+                                         timeout=0.1):
+                pass
+            if self.stopped:
+                return False, None
+            frame, frame_time = self.frame, self.frame_time
+            self.returned_sequence = self.sequence
+
+        now = time.monotonic()
+        # Wait a full period after a late frame instead of bursting to catch up.
+        self.next_due = max(self.next_due + 1.0 / self.fps, now)
+        self.position_ms = (frame_time - self.started) * 1000
+        latency = now - frame_time
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.frames_returned += 1
+        if self.recorder is not None:
+            self.recorder.write(frame)
+        return True, frame
+
+    def grab(self):
+        ret, _ = self.read()
+        return ret
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.position_ms
+        return 0
+
+    def stop(self):
+        """Make read() report the end of the stream. Safe from a signal handler."""
+        self.stopped = True
+
+    def release(self):
+        self.stopped = True
+        self.thread.join(timeout=1.0)
+        self.cap.release()
+        if self.recorder is not None:
+            self.recorder.release()
+
+    def stats(self):
+        """Summary for analytics.json: frames dropped to stay current and capture-to-pipeline latency."""
+        elapsed = time.monotonic() - self.started
+        return {
+            'source': str(self.source),
+            'target_fps': self.fps,
+            'achieved_fps': round(self.frames_returned / elapsed, 2) if elapsed > 0 else 0.0,
+            'frames_captured': self.sequence,
+            'frames_processed': self.frames_returned,
+            'frames_dropped': self.sequence - self.frames_returned,
+            'capture_latency_ms': {
+                'mean': round(self.latency_total / self.frames_returned * 1000, 1) if self.frames_returned else None,
+                'max': round(self.latency_max * 1000, 1),
+            },
+        }
@@ -0,0 +1,111 @@
+"""
+Motion Gate
+Decides which 160x120 inputs are worth a UART round trip. A frame whose mean
+absolute difference from the last frame actually sent is below the threshold
+is skipped and the board's previous answer is reused for it, but never more
+than refresh_interval - 1 frames in a row.
+
+The error a skip introduces is estimated with the bit-exact Sobel model: the
+Sobel output the skipped frame would have had versus the output reused.
+"""
+
+import numpy as np
+
+from sobel_emulator import sobel_frame, FRAME_SIZE
+
+DEFAULT_REFRESH_INTERVAL = 10
+
+
+class MotionGate:
+    def __init__(self, threshold, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.threshold = threshold
+        self.refresh_interval = max(1, refresh_interval)
+
+        self.reference = None        # last input sent to the board
+        self.reference_sobel = None  # its Sobel output (model), computed on the first skip
+        self.run = 0                 # frames skipped since the last one sent
+
+        self.sent = 0
+        self.skipped = 0
+        self.input_difference_total = 0.0
+        self.input_difference_max = 0.0
+        self.error_total = 0.0
+        self.error_max = 0.0
+
+    def should_send(self, fpga_input):
+        """True if the frame must go to the board, False to reuse the last answer."""
+        frame = np.frombuffer(fpga_input, dtype=np.uint8)
+        if self.reference is not None and self.run + 1 < self.refresh_interval:
+            difference = float(np.mean(np.abs(frame.astype(np.int16) - self.reference)))
+            if difference < self.threshold:
+                self._skip(fpga_input, difference)
+                return False
+
+        self.reference = frame.astype(np.int16)
+        self.reference_sobel = None
+        self.run = 0
+        self.sent += 1
+        return True
+
+    def _skip(self, fpga_input, difference):
+        if self.reference_sobel is None:
+            reference_bytes = self.reference.astype(np.uint8).tobytes()
+            self.reference_sobel = np.frombuffer(sobel_frame(reference_bytes), dtype=np.uint8).astype(np.int16)
+        sobel = np.frombuffer(sobel_frame(fpga_input), dtype=np.uint8)
+        error = float(np.mean(np.abs(sobel - self.reference_sobel)))
+
+        self.run += 1
+        self.skipped += 1
+        self.input_difference_total += difference
+        self.input_difference_max = max(self.input_difference_max, difference)
+        self.error_total += error
+        self.error_max = max(self.error_max, error)
+
+    def state(self, data):
+        """Everything should_send() depends on, for the session checkpoint: the
+        reference frame is appended to `data` (a bytearray), the JSON-safe rest
+        is returned with its offset there."""
+        reference = None
+        if self.reference is not None:
+            reference = len(data)
+            data += self.reference.astype(np.uint8).tobytes()
+        return {
+            'reference': reference,
+            'run': self.run,
+            'sent': self.sent,
+            'skipped': self.skipped,
+            'input_difference_total': self.input_difference_total,
+            'input_difference_max': self.input_difference_max,
+            'error_total': self.error_total,
+            'error_max': self.error_max,
+        }
+
+    def restore(self, state, data):
+        """Continue from a state() saved by an interrupted session, with its data."""
+        offset = state['reference']
+        self.reference = (np.frombuffer(data, dtype=np.uint8, count=FRAME_SIZE, offset=offset).astype(np.int16)
+                          if offset is not None else None)
+        self.reference_sobel = None
+        for name in ('run', 'sent', 'skipped', 'input_difference_total', 'input_difference_max',
+                     'error_total', 'error_max'):
+            setattr(self, name, state[name])
+
+    def stats(self):
+        """Summary for analytics.json (differences/errors in grey levels per pixel)."""
+        total = self.sent + self.skipped
+        return {
+            'threshold': self.threshold,
+            'refresh_interval': self.refresh_interval,
+            'frames_sent': self.sent,
+            'frames_skipped': self.skipped,
+            'skip_ratio': round(self.skipped / total, 3) if total else 0.0,
+            'input_difference': {
+                'mean': round(self.input_difference_total / self.skipped, 3) if self.skipped else 0.0,
+                'max': round(self.input_difference_max, 3),
+            },
+            # Mean |Sobel(skipped frame) - Sobel reused| per 160x120 pixel.
+            'estimated_sobel_error': {
+                'mean': round(self.error_total / self.skipped, 3) if self.skipped else 0.0,
+                'max': round(self.error_max, 3),
+            },
+        }
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Session Re-analysis
+Recomputes analytics.json (and, with --heatmap, heatmap.webm) for every
+finished session in the sessions folder, with the bit-exact software Sobel
+model instead of the board, so a change to the analytics reaches old
+recordings without another pass over the UART. A session's sobel.bin (the
+frames the board returned, see sobel_stream.py) is replayed when it matches
+the recording; otherwise original.webm is decoded and run through the model,
+and the result is kept as sobel.bin for the next run.
+
+analytics.json records the recording and the parameters it was computed with
+(its 'analysis' entry, see JobProcessor.analysis_params); sessions where both
+still match are skipped. Sessions run in parallel, one process each.
+"""
+
+import os
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# worker goes first: it puts fpga_link/ (repository root) on sys.path for the other modules.
+from worker import (JobProcessor, HeatmapRenderer, HeatmapWriter, SESSIONS_DIR, HEATMAP_MODES,
+                    HEATMAP_CODECS, DECODERS, DECAY_RATE, parse_size, update_job_file)
+from motion_gate import DEFAULT_REFRESH_INTERVAL
+from sobel_emulator import sobel_frame
+from session_checkpoint import source_stamp
+from sobel_stream import SobelStreamWriter, read_sobel_stream, SOBEL_STREAM_FILE
+from sobel_tiling import UNCHANGED
+
+
+def finished_sessions(sessions_dir):
+    """Sessions whose job is done and whose recording is still there, oldest first."""
+    sessions = []
+    for session_path in sorted(Path(sessions_dir).iterdir()):
+        if not (session_path / "original.webm").exists():
+            continue
+        try:
+            with open(session_path / "job.json") as f:
+                status = json.load(f).get('status')
+        except (OSError, ValueError):
+            continue
+        if status == "done":
+            sessions.append(session_path)
+    return sessions
+
+
+def expected_analysis(processor, session_path):
+    """The 'analysis' entry a fresh analytics.json of this session would have."""
+    return dict(processor.analysis_params(), source=source_stamp(session_path / "original.webm"))
+
+
+def is_current(processor, session_path):
+    """Whether analytics.json was computed from this recording with these parameters."""
+    try:
+        with open(session_path / "analytics.json") as f:
+            analysis = json.load(f).get('analysis')
+    except (OSError, ValueError):
+        return False
+    return analysis == expected_analysis(processor, session_path)
+
+
+def usable_stream(processor, session_path):
+    """The session's sobel.bin header and memory-mapped Sobel frames if it is
+    complete and was recorded from this original.webm with the same decoder,
+    motion gating and tiling, else (None, None)."""
+    path = session_path / SOBEL_STREAM_FILE
+    if not path.exists():
+        return None, None
+    try:
+        header, frames, _ = read_sobel_stream(path)
+    except (OSError, ValueError):
+        return None, None
+    gated = processor.motion_threshold > 0
+    if (header['frames'] is None
+            or header.get('source') != source_stamp(session_path / "original.webm")
+            or header.get('decoder') != processor.decoder
+            or header.get('motion_threshold') != processor.motion_threshold
+            or (gated and header.get('refresh_interval') != processor.refresh_interval)
+            or header.get('tile_threshold', 0.0) != processor.tile_threshold
+            or (header['width'], header['height']) != tuple(processor.sobel_size)
+            # Streams written before the stats were recorded cannot restore them.
+            or (gated and 'motion_gate' not in header)
+            or (processor.tiled_size is not None and 'tiling' not in header)):
+        return None, None
+    return header, frames
+
+
+def software_sobel_frames(processor, session_path, fps, gate, tiler):
+    """Decode original.webm and run each frame through the Sobel model (gated
+    and tiled like the worker would), keeping the results as sobel.bin (if the
+    processor keeps streams)."""
+    stream = None
+    if processor.sobel_stream:
+        stream = SobelStreamWriter(session_path / SOBEL_STREAM_FILE, fps, processor.sobel_size)
+    cap = processor.open_video(session_path / "original.webm", fps)
+    sobel = None
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if tiler is not None:
+                sobel = tiler.stitch([tile if tile is UNCHANGED else sobel_frame(tile)
+                                      for tile in tiler.split(frame)])
+            else:
+                fpga_input = processor.frame_to_fpga_format(frame)
+                # A skipped frame reuses the previous answer, as the board's would be.
+                if gate is None or gate.should_send(fpga_input):
+                    sobel = sobel_frame(fpga_input)
+            if stream is not None:
+                stream.append(sobel)
+            yield sobel
+    except BaseException:
+        if stream is not None:
+            stream.discard()
+        raise
+    finally:
+        cap.release()
+    if stream is not None:
+        stream.close(source=source_stamp(session_path / "original.webm"),
+                     **processor.stream_meta(gate, tiler))
+
+
+def reanalyze_session(processor, session_path, heatmap=False, decode=False):
+    """Run one recording through the software path, from sobel.bin when it is
+    usable (unless decode) or else from original.webm. Returns the frame count.
+
+    heatmap.webm is written next to the old one and only replaces it once
+    complete; analytics.json and timeline.bin are replaced atomically.
+    """
+    original_video = session_path / "original.webm"
+    heatmap_video = session_path / "heatmap.webm"
+    width, height, fps, _ = processor.get_video_info(original_video)
+    accum_size, output_size = processor.heatmap_sizes(width, height)
+
+    out = None
+    tmp_video = heatmap_video.with_name("heatmap.reanalysis.webm")
+    if heatmap:
+        out = HeatmapWriter(tmp_video, HEATMAP_CODECS[processor.heatmap_codec], fps, output_size)
+        if not out.isOpened():
+            raise RuntimeError("could not create the heatmap video writer")
+
+    renderer = HeatmapRenderer(accum_size[0], accum_size[1], fps, out, processor.compute_hot_zones,
+                               decay_rate=processor.decay_rate,
+                               output_size=output_size, source_size=(width, height))
+    header, frames = (None, None) if decode else usable_stream(processor, session_path)
+    gate = tiler = None
+    if frames is None:
+        gate, tiler = processor.make_gate(), processor.make_tiler()
+        frames = software_sobel_frames(processor, session_path, fps, gate, tiler)
+    try:
+        for sobel in frames:
+            renderer.push(processor.fpga_response_to_frame(sobel, renderer.width, renderer.height))
+    finally:
+        if out is not None:
+            out.release()
+
+    if out is not None:
+        if out.error is not None:
+            tmp_video.unlink(missing_ok=True)
+            raise RuntimeError(f"heatmap encoder failed: {out.error}")
+        os.replace(tmp_video, heatmap_video)
+
+    try:
+        analytics = processor.final_analytics(renderer)
+        analytics['analysis'] = expected_analysis(processor, session_path)
+        # The replayed stream carries the stats of the run that recorded it.
+        stats = header if header is not None else processor.stream_meta(gate, tiler)
+        for name in ('motion_gate', 'tiling'):
+            if name in stats:
+                analytics[name] = stats[name]
+        processor.write_analytics(session_path, renderer, analytics)
+    finally:
+        renderer.close()
+    update_job_file(session_path, total_frames=renderer.frame_count,
+                    processed_frames=renderer.frame_count)
+    return renderer.frame_count
+
+
+# Per-process JobProcessor of the pool (see _init_pool_worker).
+_pool_processor = None
+
+
+def make_processor(args):
+    return JobProcessor(backend='emulator', checkpoint=False, heatmap_mode=args.heatmap_mode,
+                        heatmap_size=args.heatmap_size, heatmap_codec=args.heatmap_codec,
+                        decay_rate=args.decay_rate, sobel_stream=not args.no_sobel_stream,
+                        motion_threshold=args.motion_threshold, refresh_interval=args.refresh_interval,
+                        decoder=args.decoder, tiled_size=args.tiled_size, tile_threshold=args.tile_threshold)
+
+
+def _init_pool_worker(args):
+    global _pool_processor
+    _pool_processor = make_processor(args)
+
+
+def _run_pool_session(session_path, heatmap, decode):
+    """Pool task: returns (frames, seconds, error message or None)."""
+    start = time.monotonic()
+    try:
+        frames = reanalyze_session(_pool_processor, session_path, heatmap, decode)
+    except Exception as e:
+        traceback.print_exc()
+        return 0, time.monotonic() - start, str(e)
+    return frames, time.monotonic() - start, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute analytics for finished sessions")
+    parser.add_argument("--sessions-dir", type=Path, default=SESSIONS_DIR)
+    parser.add_argument("--heatmap", action="store_true",
+                        help="Also re-render heatmap.webm (default: analytics.json and timeline.bin only).")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-analyze sessions even if their analytics.json is current.")
+    parser.add_argument("--decode", action="store_true",
+                        help=f"Decode original.webm even where {SOBEL_STREAM_FILE} could be replayed.")
+    parser.add_argument("--decoder", choices=DECODERS, default='opencv',
+                        help="How original.webm is decoded, as in worker.py.")
+    parser.add_argument("--no-sobel-stream", action="store_true",
+                        help=f"Do not save {SOBEL_STREAM_FILE} for sessions that had to be decoded.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Sessions re-analyzed in parallel, one process each (default: all cores).")
+    parser.add_argument("--decay-rate", type=float, default=DECAY_RATE,
+                        help="Per-frame decay of the movement heatmap.")
+    parser.add_argument("--heatmap-mode", choices=HEATMAP_MODES, default='full',
+                        help="Resolution the heatmap is accumulated at, as in worker.py.")
+    parser.add_argument("--heatmap-size", type=parse_size, metavar="WxH",
+                        help="Resolution heatmap.webm is written at with --heatmap.")
+    parser.add_argument("--heatmap-codec", choices=sorted(HEATMAP_CODECS), default='vp8')
+    parser.add_argument("--motion-threshold", type=float, default=0.0,
+                        help="Replay the motion gate the sessions were recorded with, as in worker.py.")
+    parser.add_argument("--refresh-interval", type=int, default=DEFAULT_REFRESH_INTERVAL,
+                        help="With --motion-threshold, send at least one frame in every N.")
+    parser.add_argument("--tiled-size", type=parse_size, metavar="WxH",
+                        help="Run the Sobel at this resolution as 160x120 tiles, as in worker.py.")
+    parser.add_argument("--tile-threshold", type=float, default=0.0,
+                        help="With --tiled-size, grey level below which a tile counts as unchanged.")
+    args = parser.parse_args()
+
+    processor = make_processor(args)
+    sessions = finished_sessions(args.sessions_dir)
+    stale = [p for p in sessions if args.force or not is_current(processor, p)]
+    processor.close()
+    print(f"{len(sessions)} finished session(s) in {args.sessions_dir}, "
+          f"{len(sessions) - len(stale)} already current, {len(stale)} to re-analyze")
+    if not stale:
+        return
+
+    start = time.monotonic()
+    total_frames = 0
+    failed = []
+    jobs = max(1, min(args.jobs, len(stale)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_pool_worker, initargs=(args,)) as executor:
+        futures = {executor.submit(_run_pool_session, p, args.heatmap, args.decode): p for p in stale}
+        for done, future in enumerate(as_completed(futures), 1):
+            session_path = futures[future]
+            frames, seconds, error = future.result()
+            if error is not None:
+                failed.append(session_path.name)
+                print(f"[{done}/{len(stale)}] {session_path.name}: failed: {error}")
+                continue
+            total_frames += frames
+            print(f"[{done}/{len(stale)}] {session_path.name}: {frames} frames in {seconds:.1f}s")
+
+    elapsed = time.monotonic() - start
+    print(f"\nRe-analyzed {len(stale) - len(failed)} session(s), {total_frames} frames in "
+          f"{elapsed:.1f}s ({total_frames / elapsed if elapsed > 0 else 0:.0f} frames/s, {jobs} process(es))")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Session Checkpoint
+Records how many Sobel frames of sobel.bin (see sobel_stream.py) a session has
+made durable, so an interrupted session resumes where it stopped instead of
+starting over. The heatmap and analytics are a deterministic function of that
+stream: on resume the recorded frames are replayed from sobel.bin through the
+renderer (CPU only) and only the remaining frames go to the board, giving the
+same output as an uninterrupted run. Frames written after the last save() are
+dropped from sobel.bin and sent again.
+
+Stages that carry state from frame to frame (the motion gate, the tiler) hand
+it in with every save(), and a resume starts from that state, so their
+decisions and stats also match an uninterrupted run. checkpoint.json keeps
+only their counters and offsets; the frame data those point into (reference
+frame, last tile inputs) goes raw to a sidecar file. The two sidecars are
+written in turn, so the one the current checkpoint.json names is never the
+one being rewritten.
+"""
+
+import os
+import json
+
+from fpga_link import FRAME_SIZE, atomic_write, write_json_atomic
+from sobel_stream import SOBEL_STREAM_FILE, HEADER_SIZE, read_header
+
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_DATA_FILES = ("checkpoint.0.bin", "checkpoint.1.bin")
+
+# Frames between checkpoint saves (each one fsyncs sobel.bin first).
+CHECKPOINT_SYNC_FRAMES = 25
+
+
+def is_sync_frame(frame_idx):
+    """True if the checkpoint is saved right after this frame."""
+    return (frame_idx + 1) % CHECKPOINT_SYNC_FRAMES == 0
+
+
+def source_stamp(video_path):
+    """Identifies the recording a checkpoint belongs to."""
+    st = os.stat(video_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+class SessionCheckpoint:
+    def __init__(self, session_path, video_path, frame_size=FRAME_SIZE, settings=None, stateful=False,
+                 keep_stream=True):
+        """`settings` are the options the frames depend on besides the recording;
+        a checkpoint written with other settings is not resumed. A `stateful`
+        checkpoint is only resumed with the state saved along with the frames.
+        Without `keep_stream` sobel.bin only serves the checkpoint and goes with it."""
+        self.path = session_path / CHECKPOINT_FILE
+        self.session_path = session_path
+        self.stream_path = session_path / SOBEL_STREAM_FILE
+        # Tiled sessions record stitched frames, larger than the board's 160x120.
+        self.frame_size = frame_size
+        self.meta = {'source': source_stamp(video_path), 'frame_size': frame_size,
+                     'settings': settings or {}, 'stateful': stateful}
+        self.stateful = stateful
+        self.keep_stream = keep_stream
+        self.resume_frames = 0
+        self.resume_state = None
+        self.resume_data = b''
+        self.saved_frames = 0
+        self.data_file = None
+
+    def open(self):
+        """Returns the number of frames of sobel.bin that can be resumed;
+        resume_state and resume_data then hold the state saved with them."""
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+            valid = {key: saved.get(key) for key in self.meta} == self.meta
+            if valid:
+                header = read_header(self.stream_path)
+                valid = header['width'] * header['height'] == self.frame_size
+            if valid:
+                available = header['frames']
+                if available is None:
+                    # A crash can leave half a frame at the end.
+                    available = (self.stream_path.stat().st_size - HEADER_SIZE) // self.frame_size
+                valid = available >= saved['frames']
+            if valid and self.stateful and saved['frames']:
+                data = (self.session_path / saved['data']).read_bytes()
+        except:
+            valid = False
+
+        if valid:
+            self.resume_frames, self.resume_state = saved['frames'], saved['state']
+            self.data_file = saved['data']
+            self.resume_data = data if self.stateful and saved['frames'] else b''
+        else:
+            self.resume_frames, self.resume_state, self.resume_data = 0, None, b''
+            self.save(0)
+        self.saved_frames = self.resume_frames
+        return self.resume_frames
+
+    def replay(self):
+        """Yield the frames recorded before open(), in order, from sobel.bin."""
+        with open(self.stream_path, 'rb') as f:
+            f.seek(HEADER_SIZE)
+            for _ in range(self.resume_frames):
+                data = f.read(self.frame_size)
+                if len(data) < self.frame_size:
+                    return
+                yield data
+
+    def last_frame(self):
+        """The last frame recorded before open(), from sobel.bin."""
+        with open(self.stream_path, 'rb') as f:
+            f.seek(HEADER_SIZE + (self.resume_frames - 1) * self.frame_size)
+            return f.read(self.frame_size)
+
+    def save(self, frames, state=None, data=None):
+        """Record that the first `frames` frames of sobel.bin are durable (the
+        caller has synced it), with the stage state right after the last one
+        and the raw data its offsets point into."""
+        data_file = None
+        if data is not None:
+            data_file = CHECKPOINT_DATA_FILES[1] if self.data_file == CHECKPOINT_DATA_FILES[0] \
+                else CHECKPOINT_DATA_FILES[0]
+            with atomic_write(self.session_path / data_file) as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        write_json_atomic(self.path, dict(self.meta, frames=frames, state=state, data=data_file))
+        self.saved_frames = frames
+        self.data_file = data_file
+
+    def discard(self):
+        """Remove the checkpoint once the session has finished."""
+        paths = [self.path] + [self.session_path / name for name in CHECKPOINT_DATA_FILES]
+        if not self.keep_stream:
+            paths.append(self.stream_path)
+        for path in paths:
+            if path.exists():
+                path.unlink()
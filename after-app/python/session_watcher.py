@@ -0,0 +1,243 @@
+"""
+Session Watcher
+In-memory index of session job states for the worker. On Linux it follows
+inotify events on the sessions folder and re-reads only the job.json that
+changed; elsewhere (or when inotify is unavailable) it rescans the folder and
+re-parses only job files whose mtime/size changed.
+
+wait() selects on the inotify fd and a self-pipe that wake() writes to; the
+polling fallback waits on a threading.Event instead, since select() only
+takes sockets on Windows.
+"""
+
+import os
+import json
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from pathlib import Path
+
+JOB_FILE = "job.json"
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+SESSIONS_MASK = IN_CREATE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM | IN_ONLYDIR
+SESSION_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_ONLYDIR
+
+EVENT_HEADER = struct.Struct('iIII')
+EVENT_BUFFER_SIZE = 64 * 1024
+
+
+def read_job_status(session_path):
+    """Status field of a session's job.json, or None if missing/unreadable."""
+    try:
+        with open(session_path / JOB_FILE, 'r') as f:
+            return json.load(f).get("status")
+    except:
+        return None
+
+
+class _Inotify:
+    """Minimal ctypes binding to the Linux inotify API (non-blocking fd)."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify not supported on this platform")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def read_events(self):
+        """Yield (wd, mask, name) for every queued event."""
+        while True:
+            try:
+                data = os.read(self.fd, EVENT_BUFFER_SIZE)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                offset += length
+                yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SessionWatcher:
+    """Tracks the status of every session and wakes up when one changes."""
+
+    def __init__(self, sessions_dir, poll_interval=5, use_inotify=True):
+        self.sessions_dir = Path(sessions_dir)
+        self.poll_interval = poll_interval
+        self.states = {}
+        self.stamps = {}
+
+        # Lets other threads (e.g. finished pool jobs) interrupt wait(): the
+        # event while polling, plus a self-pipe selected with the inotify fd.
+        self.woken = threading.Event()
+        self.wake_r = self.wake_w = None
+
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+
+        self.inotify = None
+        self.watches = {}
+        self.watched = set()
+        if use_inotify:
+            try:
+                self.inotify = _Inotify()
+                self.inotify.add_watch(self.sessions_dir, SESSIONS_MASK)
+                self.wake_r, self.wake_w = os.pipe()
+                os.set_blocking(self.wake_r, False)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}), polling every {poll_interval}s")
+                self._stop_inotify()
+
+        self._rescan()
+
+    def pending(self):
+        """Sessions whose job.json says pending, oldest first."""
+        self.wait(0)
+        return sorted(path for path, status in self.states.items() if status == "pending")
+
+    def wait(self, timeout):
+        """Block until something in the sessions folder changes (or timeout), then update the index."""
+        if self.inotify is None:
+            self.woken.wait(timeout)
+            self.woken.clear()
+            self._rescan()
+            return
+
+        ready, _, _ = select.select([self.wake_r, self.inotify.fd], [], [], timeout)
+        self.woken.clear()
+        if self.wake_r in ready:
+            try:
+                while os.read(self.wake_r, 512):
+                    pass
+            except BlockingIOError:
+                pass
+        if self.inotify.fd in ready:
+            self._handle_events()
+
+    def wake(self):
+        """Make a blocked wait() return. Safe to call from any thread."""
+        self.woken.set()
+        if self.inotify is not None:
+            os.write(self.wake_w, b'\0')
+
+    def close(self):
+        self._stop_inotify()
+        for fd in (self.wake_r, self.wake_w):
+            if fd is not None:
+                os.close(fd)
+        self.wake_r = self.wake_w = None
+
+    def _stop_inotify(self):
+        if self.inotify is not None:
+            self.inotify.close()
+        self.inotify = None
+        self.watches = {}
+        self.watched = set()
+
+    def _refresh(self, session_path):
+        job_path = session_path / JOB_FILE
+        try:
+            st = job_path.stat()
+        except OSError:
+            self.states.pop(session_path, None)
+            self.stamps.pop(session_path, None)
+            return
+        self.stamps[session_path] = (st.st_mtime_ns, st.st_size)
+        self.states[session_path] = read_job_status(session_path)
+
+    def _watch(self, session_path):
+        if self.inotify is None or session_path in self.watched:
+            return
+        try:
+            wd = self.inotify.add_watch(session_path, SESSION_MASK)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            # Most likely fs.inotify.max_user_watches; keep working by polling.
+            print(f"inotify watch failed ({e}), polling every {self.poll_interval}s")
+            self._stop_inotify()
+            return
+        self.watches[wd] = session_path
+        self.watched.add(session_path)
+
+    def _rescan(self):
+        """Walk the sessions folder, re-reading only job files that changed."""
+        seen = set()
+        for session_path in self.sessions_dir.iterdir():
+            if not session_path.is_dir():
+                continue
+            self._watch(session_path)
+            try:
+                st = (session_path / JOB_FILE).stat()
+            except OSError:
+                continue
+            seen.add(session_path)
+            if self.stamps.get(session_path) != (st.st_mtime_ns, st.st_size):
+                self._refresh(session_path)
+
+        for session_path in set(self.states) - seen:
+            self.states.pop(session_path, None)
+            self.stamps.pop(session_path, None)
+
+    def _handle_events(self):
+        for wd, mask, name in self.inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                self._rescan()
+                if self.inotify is None:
+                    return
+                continue
+
+            if wd in self.watches:
+                session_path = self.watches[wd]
+                if mask & (IN_DELETE_SELF | IN_IGNORED):
+                    del self.watches[wd]
+                    self.watched.discard(session_path)
+                    self.states.pop(session_path, None)
+                    self.stamps.pop(session_path, None)
+                elif name == JOB_FILE:
+                    self._refresh(session_path)
+                continue
+
+            # Event on the sessions folder itself.
+            if not mask & IN_ISDIR:
+                continue
+            session_path = self.sessions_dir / name
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                # job.json may already be there by the time the watch is added.
+                self._watch(session_path)
+                self._refresh(session_path)
+            else:
+                self.states.pop(session_path, None)
+                self.stamps.pop(session_path, None)
+            if self.inotify is None:
+                return
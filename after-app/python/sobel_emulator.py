@@ -0,0 +1,93 @@
+"""
+Sobel Emulator
+Bit-exact NumPy model of the DE10-Lite Sobel datapath (kernel_sobel.v as wired in
+sobel_processing_unit_fd.v), usable in place of the board when none is attached.
+"""
+
+from collections import deque
+
+import numpy as np
+
+FPGA_WIDTH, FPGA_HEIGHT = 160, 120
+FRAME_SIZE = FPGA_WIDTH * FPGA_HEIGHT
+
+# kernel_sobel.v: 2 full lines + 2 pixels before the first valid window.
+LATENCY = (2 * FPGA_WIDTH) + 2
+
+
+def _border_mask():
+    """Output addresses that kernel_sobel.v forces to black.
+
+    The output coordinate counters advance on the same edge that raises
+    pixel_pronto, so the byte written to address `a` is tested against
+    coordinate `a + 1`.
+    """
+    coord = np.arange(1, FRAME_SIZE + 1)
+    row, col = coord // FPGA_WIDTH, coord % FPGA_WIDTH
+    return (row == 0) | (row == FPGA_HEIGHT - 1) | (col == 0) | (col == FPGA_WIDTH - 1)
+
+
+BORDER_MASK = _border_mask()
+
+
+def sobel_frame(frame_bytes):
+    """Run one 160x120 grayscale frame through the emulated board. Returns bytes."""
+    pixels = np.frombuffer(frame_bytes, dtype=np.uint8)
+    if pixels.size != FRAME_SIZE:
+        raise ValueError(f"Expected {FRAME_SIZE} bytes, got {pixels.size}")
+
+    # Kernel input stream: buffer_raw has a registered read port, so the first
+    # shift latches a stale byte (only ever seen by a border window) and every
+    # pixel arrives one cycle late. The last pixel is never read; once
+    # ler_pixel drops the pipeline is flushed with zeros.
+    stream = np.zeros(FRAME_SIZE + LATENCY, dtype=np.int16)
+    stream[1:FRAME_SIZE] = pixels[:FRAME_SIZE - 1]
+
+    # w[i][j] for output address a is stream[a + i*WIDTH + j].
+    def w(i, j):
+        start = i * FPGA_WIDTH + j
+        return stream[start:start + FRAME_SIZE]
+
+    gx = (w(0, 2) + 2 * w(1, 2) + w(2, 2)) - (w(0, 0) + 2 * w(1, 0) + w(2, 0))
+    gy = (w(0, 0) + 2 * w(0, 1) + w(0, 2)) - (w(2, 0) + 2 * w(2, 1) + w(2, 2))
+
+    magnitude = np.minimum(np.abs(gx) + np.abs(gy), 255).astype(np.uint8)
+    magnitude[BORDER_MASK] = 0
+    return magnitude.tobytes()
+
+
+class SobelEmulator:
+    """Drop-in replacement for fpga_link.SerialLink that computes frames locally."""
+
+    def __init__(self):
+        self.port = 'emulator'
+        self.img_size = FRAME_SIZE
+        self.pending = deque()
+
+    async def send_frame(self, frame_bytes):
+        """Process a frame; the result is queued for receive_frame()."""
+        self.pending.append(sobel_frame(frame_bytes))
+
+    async def receive_frame(self, timeout=None):
+        """Return the oldest processed frame, or None if nothing was sent."""
+        if not self.pending:
+            return None
+        return self.pending.popleft()
+
+    def clear_buffer(self):
+        """Drop any frames that were not received yet."""
+        self.pending.clear()
+
+    async def has_stray_bytes(self):
+        return False
+
+    def pending_bytes(self):
+        return b''
+
+    async def resync(self, timeout=None):
+        """The emulated stream cannot desync; just drop pending frames."""
+        self.clear_buffer()
+        return True
+
+    def close(self):
+        self.clear_buffer()
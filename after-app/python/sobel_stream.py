@@ -0,0 +1,129 @@
+"""
+Sobel Stream
+Every Sobel frame of a session, as the renderer received it, kept as
+sobel.bin so heatmap and analytics changes can be re-run without the board
+(see reanalyze.py).
+
+Layout (little-endian):
+    b'SBSS'  uint32 header length  JSON header (space padded)  frames  index
+The header area is fixed at HEADER_SIZE bytes, so the frames start on a page
+boundary and the header can be rewritten in place. Frames are uint8, back to
+back, height*width bytes each (160x120, or the tiled resolution, see
+sobel_tiling.py); the index that follows them, 8-byte aligned, is one
+float64 timestamp (ms) per frame. The header is finalized on close():
+{version, width, height, frames, fps, index_offset, source, decoder,
+motion_threshold, refresh_interval, tile_threshold} plus the motion_gate/tiling stats of gated
+or tiled sessions.
+A writer that dies leaves frames: null and no index; the frames that made it
+to disk are still readable, and a resumed session (session_checkpoint.py)
+goes on appending after the ones its checkpoint recorded.
+"""
+
+import os
+import json
+import struct
+import numpy as np
+
+SOBEL_STREAM_FILE = "sobel.bin"
+MAGIC = b'SBSS'
+VERSION = 1
+PREFIX = struct.Struct('<4sI')
+HEADER_SIZE = 4096
+
+FRAME_WIDTH, FRAME_HEIGHT = 160, 120
+
+
+def _encode_header(header):
+    encoded = json.dumps(header, separators=(',', ':')).encode()
+    if PREFIX.size + len(encoded) > HEADER_SIZE:
+        raise ValueError("sobel stream header too large")
+    return PREFIX.pack(MAGIC, HEADER_SIZE - PREFIX.size) + encoded.ljust(HEADER_SIZE - PREFIX.size)
+
+
+class SobelStreamWriter:
+    """Appends a session's Sobel frames to a new sobel.bin, or with
+    resume_frames to the first that many frames of an existing one."""
+
+    def __init__(self, path, fps, size=(FRAME_WIDTH, FRAME_HEIGHT), resume_frames=0):
+        self.path = path
+        width, height = size
+        self.frame_size = width * height
+        self.header = {'version': VERSION, 'width': width, 'height': height,
+                       'frames': None, 'fps': fps, 'index_offset': None}
+        self.frames = resume_frames
+        self.file = open(path, 'r+b' if resume_frames else 'wb')
+        self.file.truncate(HEADER_SIZE + resume_frames * self.frame_size)
+        self.file.write(_encode_header(self.header))
+        self.file.seek(0, os.SEEK_END)
+
+    def append(self, frame_bytes):
+        self.file.write(frame_bytes)
+        self.frames += 1
+
+    def sync(self):
+        """Make the frames appended so far durable."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self, timestamps=None, **meta):
+        """Write the timestamp index and the final header. Without timestamps
+        (ms, one per frame) they are derived from the frame rate; meta (e.g.
+        source, motion_threshold) is stored in the header."""
+        if self.file is None:
+            return
+        if timestamps is None or len(timestamps) < self.frames:
+            timestamps = np.arange(self.frames) * (1000.0 / self.header['fps'])
+        index = np.asarray(timestamps[:self.frames], dtype='<f8')
+        frames_end = HEADER_SIZE + self.frames * self.frame_size
+        index_offset = (frames_end + 7) // 8 * 8
+        self.header.update(meta, frames=self.frames, index_offset=index_offset)
+        self.file.write(bytes(index_offset - frames_end))
+        self.file.write(index.tobytes())
+        self.file.seek(0)
+        self.file.write(_encode_header(self.header))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+
+    def release(self):
+        """Close an unfinished stream, keeping it for a checkpointed resume."""
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Close and remove an unfinished stream."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.path.exists():
+            self.path.unlink()
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        magic, header_size = PREFIX.unpack(f.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Sobel stream")
+        return json.loads(f.read(header_size))
+
+
+def read_sobel_stream(path):
+    """Memory-map a stream. Returns (header, frames, timestamps): frames is a
+    read-only (N, height, width) uint8 array, timestamps (ms) is None if the
+    stream was never finalized."""
+    header = read_header(path)
+    width, height = header['width'], header['height']
+    count = header['frames']
+    if count is None:
+        count = (os.path.getsize(path) - HEADER_SIZE) // (width * height)
+    if count == 0:
+        return header, np.zeros((0, height, width), dtype=np.uint8), None
+    frames = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE,
+                       shape=(count, height, width))
+    timestamps = None
+    if header['index_offset'] is not None:
+        timestamps = np.memmap(path, dtype='<f8', mode='r', offset=header['index_offset'], shape=(count,))
+    return header, frames, timestamps
@@ -0,0 +1,143 @@
+"""
+Sobel Tiling
+Runs the Sobel filter at a resolution above the board's fixed 160x120 by
+sending each frame as overlapping 160x120 tiles and stitching the answers.
+
+kernel_sobel.v zeroes the frame border and, as wired (see sobel_emulator),
+writes the result for the window centred on tile pixel (r, c) to address
+(r - 1, c). The results that come from a full window and survive the border
+mask are those centred on rows 2..118 and columns 1..156, so each tile carries
+a halo of 2 rows above, 1 below, 1 column left and 2 right around a
+CORE_HEIGHT x CORE_WIDTH core, and neighbouring tiles' cores meet without a
+seam. The image is zero-padded to a whole number of tiles and, like the
+board's own output, the outer one-pixel border of the stitched frame is 0.
+
+A tile whose input has not changed since it was last sent (byte-identical,
+or within `threshold` mean grey levels) is not sent again: split() marks it
+UNCHANGED and stitch() keeps that tile's previous result. The last inputs go
+into the session checkpoint and the results are taken back from the last
+checkpointed frame, so a resumed session skips and reuses the same tiles as
+an uninterrupted one.
+"""
+
+import cv2
+import numpy as np
+
+from sobel_emulator import FPGA_WIDTH, FPGA_HEIGHT, FRAME_SIZE
+
+HALO_TOP, HALO_LEFT = 2, 1
+CORE_HEIGHT, CORE_WIDTH = FPGA_HEIGHT - 3, FPGA_WIDTH - 3
+
+# Placed in a frame's tile list instead of the input of a tile that is not resent.
+UNCHANGED = object()
+
+
+class SobelTiler:
+    """Splits frames into tiles (decode side) and stitches results (render side).
+
+    split() and stitch() keep separate state, so they can run on different
+    threads; both must see the frames in order.
+    """
+
+    def __init__(self, width, height, threshold=0.0):
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.rows = -(-height // CORE_HEIGHT)
+        self.cols = -(-width // CORE_WIDTH)
+        self.tiles = [(ty * CORE_HEIGHT, tx * CORE_WIDTH) for ty in range(self.rows) for tx in range(self.cols)]
+        padded_shape = (self.rows * CORE_HEIGHT + 3, self.cols * CORE_WIDTH + 3)
+
+        # split(): the zero-padded input and the last input sent per tile.
+        self.padded = np.zeros(padded_shape, dtype=np.uint8)
+        self.sent_inputs = [None] * len(self.tiles)
+        self.tiles_sent = 0
+        self.tiles_skipped = 0
+
+        # stitch(): the latest result of every tile, in place.
+        self.canvas = np.zeros((self.rows * CORE_HEIGHT, self.cols * CORE_WIDTH), dtype=np.uint8)
+
+    @property
+    def tiles_per_frame(self):
+        return len(self.tiles)
+
+    def to_gray(self, frame):
+        """BGR (or already gray) frame at any size -> gray at the tiling resolution."""
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if frame.shape != (self.height, self.width):
+            frame = cv2.resize(frame, (self.width, self.height))
+        return frame
+
+    def split(self, frame):
+        """Tile inputs (19,200 bytes each, or UNCHANGED) of one frame, row-major."""
+        self.padded[HALO_TOP:HALO_TOP + self.height, HALO_LEFT:HALO_LEFT + self.width] = self.to_gray(frame)
+        inputs = []
+        for i, (y, x) in enumerate(self.tiles):
+            tile = self.padded[y:y + FPGA_HEIGHT, x:x + FPGA_WIDTH]
+            if self._unchanged(i, tile):
+                self.tiles_skipped += 1
+                inputs.append(UNCHANGED)
+                continue
+            data = tile.tobytes()
+            self.sent_inputs[i] = data
+            self.tiles_sent += 1
+            inputs.append(data)
+        return inputs
+
+    def _unchanged(self, i, tile):
+        previous = self.sent_inputs[i]
+        if previous is None:
+            return False
+        if self.threshold <= 0:
+            return tile.tobytes() == previous
+        previous = np.frombuffer(previous, dtype=np.uint8).reshape(FPGA_HEIGHT, FPGA_WIDTH)
+        return float(np.mean(cv2.absdiff(tile, previous))) < self.threshold
+
+    def stitch(self, results):
+        """Assemble one frame from its tile results (bytes, or UNCHANGED to keep
+        the tile's previous result). Returns width x height Sobel bytes."""
+        for (y, x), result in zip(self.tiles, results):
+            if result is UNCHANGED:
+                continue
+            out = np.frombuffer(result, dtype=np.uint8).reshape(FPGA_HEIGHT, FPGA_WIDTH)
+            self.canvas[y:y + CORE_HEIGHT, x:x + CORE_WIDTH] = \
+                out[HALO_TOP - 1:HALO_TOP - 1 + CORE_HEIGHT, HALO_LEFT:HALO_LEFT + CORE_WIDTH]
+        frame = self.canvas[:self.height, :self.width].copy()
+        frame[0, :] = frame[-1, :] = 0
+        frame[:, 0] = frame[:, -1] = 0
+        return frame.tobytes()
+
+    def split_state(self, data):
+        """split()'s state for the session checkpoint: the last input sent per
+        tile is appended to `data` (a bytearray), the JSON-safe rest is returned
+        with their offsets there (None for a tile never sent)."""
+        offsets = []
+        for tile in self.sent_inputs:
+            offsets.append(len(data) if tile is not None else None)
+            if tile is not None:
+                data += tile
+        return {'sent_inputs': offsets, 'tiles_sent': self.tiles_sent, 'tiles_skipped': self.tiles_skipped}
+
+    def restore(self, state, data, last_frame):
+        """Continue from a split_state() saved by an interrupted session, with
+        its data. stitch() only needs the last stitched frame: the canvas
+        outside it (border and padding) never reaches the output."""
+        self.sent_inputs = [bytes(data[offset:offset + FRAME_SIZE]) if offset is not None else None
+                            for offset in state['sent_inputs']]
+        self.tiles_sent = state['tiles_sent']
+        self.tiles_skipped = state['tiles_skipped']
+        self.canvas[:self.height, :self.width] = np.frombuffer(last_frame, dtype=np.uint8).reshape(
+            self.height, self.width)
+
+    def stats(self):
+        """Summary for analytics.json."""
+        total = self.tiles_sent + self.tiles_skipped
+        return {
+            'resolution': {'width': self.width, 'height': self.height},
+            'tiles_per_frame': self.tiles_per_frame,
+            'threshold': self.threshold,
+            'tiles_sent': self.tiles_sent,
+            'tiles_skipped': self.tiles_skipped,
+            'skip_ratio': round(self.tiles_skipped / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,167 @@
+"""
+Streaming Analytics
+Running movement statistics updated as heatmap intensity samples arrive, so a
+session can report periodicity, cycles and averages while it is still being
+processed, and its final summary without keeping the timeline in memory.
+State is bounded by the periodicity window and the range of intensity values,
+not the session length; the session-wide passes (session_periodicity,
+session_rhythm) read the timeline back from its spool at the end.
+"""
+
+from collections import Counter, deque
+
+import numpy as np
+
+# ~25 s of history at the 10 Hz intensity sample rate.
+PERIODICITY_WINDOW = 256
+MIN_PERIODICITY_SAMPLES = 10
+MIN_RHYTHM_SAMPLES = 20
+
+
+class StreamingAnalytics:
+    """Online counterpart of compute_periodicity / compute_rhythm_regularity."""
+
+    def __init__(self, sample_rate, window=PERIODICITY_WINDOW, threshold_percentile=75):
+        self.sample_rate = sample_rate
+        self.threshold_percentile = threshold_percentile
+        self.window = deque(maxlen=window)
+
+        self.sample_count = 0
+        self.intensity_sum = 0.0
+
+        # Peak (cycle) tracking: a sample is a peak once its right neighbour is
+        # known, judged against the threshold of the window at that moment.
+        self.cycle_count = 0
+        self.last_peak = None
+        self.interval_count = 0
+        self.interval_mean = 0.0
+        self.interval_m2 = 0.0
+
+        # Samples are rounded to 0.01, so counting them per hundredth gives
+        # exact session percentiles.
+        self.histogram = Counter()
+
+    def add_sample(self, intensity):
+        """Fold in one intensity sample (one per heatmap sample interval)."""
+        self.window.append(intensity)
+        self.sample_count += 1
+        self.intensity_sum += intensity
+        self.histogram[round(intensity * 100)] += 1
+
+        if len(self.window) >= 3:
+            before, middle, after = self.window[-3], self.window[-2], self.window[-1]
+            threshold = np.percentile(self.window, self.threshold_percentile)
+            if middle > threshold and middle > before and middle > after:
+                self._add_peak(self.sample_count - 2)
+
+    def _add_peak(self, index):
+        self.cycle_count += 1
+        if self.last_peak is not None:
+            # Welford running mean/variance of the peak-to-peak intervals.
+            interval = index - self.last_peak
+            self.interval_count += 1
+            delta = interval - self.interval_mean
+            self.interval_mean += delta / self.interval_count
+            self.interval_m2 += delta * (interval - self.interval_mean)
+        self.last_peak = index
+
+    def average(self):
+        return self.intensity_sum / self.sample_count if self.sample_count else 0.0
+
+    def periodicity(self):
+        """Dominant frequency (Hz) and its strength over the recent window."""
+        if len(self.window) < MIN_PERIODICITY_SAMPLES:
+            return None, None
+
+        signal = np.array(self.window)
+        signal = signal - np.mean(signal)
+
+        fft = np.abs(np.fft.rfft(signal))
+        freqs = np.fft.rfftfreq(len(signal), 1.0 / self.sample_rate)
+        fft[0] = 0
+
+        peak_idx = np.argmax(fft)
+        if freqs[peak_idx] > 0 and fft[peak_idx] > 0:
+            return float(freqs[peak_idx]), float(fft[peak_idx])
+        return None, None
+
+    def percentile(self, q):
+        """Exact percentile of every sample so far (linear interpolation, as np.percentile)."""
+        if not self.sample_count:
+            return 0.0
+        keys = sorted(self.histogram)
+        ends = np.cumsum([self.histogram[key] for key in keys])
+
+        def ranked(rank):
+            return keys[int(np.searchsorted(ends, rank, side='right'))] / 100
+
+        position = (self.sample_count - 1) * q / 100
+        lower = int(np.floor(position))
+        low, high = ranked(lower), ranked(int(np.ceil(position)))
+        return float(low + (high - low) * (position - lower))
+
+    def rhythm_regularity(self):
+        """1 - coefficient of variation of the peak intervals, clamped to [0, 1]."""
+        if self.sample_count < MIN_RHYTHM_SAMPLES or self.interval_count == 0:
+            return None
+        if self.interval_mean <= 0:
+            return 0.0
+        std = np.sqrt(self.interval_m2 / self.interval_count)
+        return float(max(0, min(1, 1.0 - std / self.interval_mean)))
+
+
+def session_periodicity(intensities, sample_rate):
+    """Dominant frequency (Hz) and its strength over a whole timeline: the FFT
+    of the mean-removed intensity samples (e.g. the memory-mapped spool column,
+    copied once here), exactly as the batch analysis computed it."""
+    if len(intensities) < MIN_PERIODICITY_SAMPLES:
+        return None, None
+
+    signal = np.array(intensities, dtype=np.float64)
+    signal = signal - np.mean(signal)
+
+    fft = np.abs(np.fft.rfft(signal))
+    freqs = np.fft.rfftfreq(len(signal), 1.0 / sample_rate)
+    if len(fft) < 2:
+        return None, None
+    fft[0] = 0
+
+    peak_idx = np.argmax(fft)
+    if freqs[peak_idx] > 0:
+        return float(freqs[peak_idx]), float(fft[peak_idx])
+    return None, None
+
+
+def session_rhythm(chunks, threshold, min_samples=MIN_RHYTHM_SAMPLES):
+    """Regularity and number of the peaks above `threshold` in a whole timeline,
+    read as consecutive chunks of intensity samples (e.g. from a memory-mapped
+    spool). Returns (regularity or None, peak count)."""
+    count = 0
+    peaks = 0
+    last_peak = None
+    interval_count, interval_mean, interval_m2 = 0, 0.0, 0.0
+    before = middle = None
+    for chunk in chunks:
+        for value in np.asarray(chunk, dtype=np.float64).tolist():
+            if middle is not None and before is not None:
+                if middle > threshold and middle > before and middle > value:
+                    peaks += 1
+                    index = count - 1
+                    if last_peak is not None:
+                        interval = index - last_peak
+                        interval_count += 1
+                        delta = interval - interval_mean
+                        interval_mean += delta / interval_count
+                        interval_m2 += delta * (interval - interval_mean)
+                    last_peak = index
+            before, middle = middle, value
+            count += 1
+
+    if count < min_samples:
+        return None, 0
+    if peaks < 2:
+        return None, peaks
+    if interval_mean <= 0:
+        return 0.0, peaks
+    regularity = 1.0 - np.sqrt(interval_m2 / interval_count) / interval_mean
+    return float(max(0, min(1, regularity))), peaks
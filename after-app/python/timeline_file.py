@@ -0,0 +1,199 @@
+"""
+Timeline File
+Compact columnar storage for a session's dense analytics series (sample
+times, frames, intensity and the 3x3 zone percentages), written next to
+analytics.json as timeline.bin.
+
+Layout (little-endian):
+    b'SBTL'  uint32 header length  JSON header  column data
+The JSON header lists every column as {dtype, offset, length}; offsets are
+from the start of the file and 8-byte aligned, so each column can be
+memory-mapped (numpy) or viewed as a typed array (JS) without parsing.
+`levels` holds min/max downsamples of the intensity, each DOWNSAMPLE_FACTOR
+times coarser than the previous one, so a plot can load a coarse level first.
+
+While a session runs its samples go to a TimelineSpool (an anonymous
+temporary file) instead of memory; write_timeline() turns the spool into
+timeline.bin a chunk at a time.
+"""
+
+import json
+import struct
+import tempfile
+import numpy as np
+
+from fpga_link import atomic_write
+
+TIMELINE_FILE = "timeline.bin"
+MAGIC = b'SBTL'
+VERSION = 1
+PREFIX = struct.Struct('<4sI')
+ALIGNMENT = 8
+
+ZONE_NAMES = ('tl', 'tc', 'tr', 'ml', 'mc', 'mr', 'bl', 'bc', 'br')
+
+DOWNSAMPLE_FACTOR = 4
+MIN_LEVEL_LENGTH = 64  # stop adding levels once one is this short
+
+# One timeline sample as spooled during a session.
+SAMPLE_DTYPE = np.dtype([('frame', '<u4'), ('intensity', '<f8'), ('zones', '<f4', (len(ZONE_NAMES),))])
+# Samples handled at once when writing timeline.bin (a multiple of DOWNSAMPLE_FACTOR).
+WRITE_CHUNK = DOWNSAMPLE_FACTOR ** 8
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class TimelineSpool:
+    """A session's timeline samples, appended to a temporary file as they are taken."""
+
+    def __init__(self, buffer_size=1024):
+        self.file = tempfile.TemporaryFile()
+        self.buffer = np.zeros(buffer_size, dtype=SAMPLE_DTYPE)
+        self.buffered = 0
+        self.length = 0
+
+    def append(self, frame, intensity, zones):
+        """Add one sample; zones are the zone percentages in ZONE_NAMES order."""
+        self.buffer[self.buffered] = (frame, intensity, zones)
+        self.buffered += 1
+        self.length += 1
+        if self.buffered == len(self.buffer):
+            self._flush()
+
+    def _flush(self):
+        self.file.write(self.buffer[:self.buffered].tobytes())
+        self.buffered = 0
+
+    def samples(self):
+        """Every sample so far as a read-only structured array (memory-mapped)."""
+        self._flush()
+        self.file.flush()
+        if self.length == 0:
+            return np.zeros(0, dtype=SAMPLE_DTYPE)
+        return np.memmap(self.file, dtype=SAMPLE_DTYPE, mode='r', shape=(self.length,))
+
+    def chunks(self, field, size=WRITE_CHUNK):
+        """One field of the samples, in consecutive chunks."""
+        samples = self.samples()
+        for start in range(0, len(samples), size):
+            yield samples[field][start:start + size]
+
+    def close(self):
+        self.file.close()
+
+
+def downsample_minmax(mins, maxs, factor=DOWNSAMPLE_FACTOR):
+    """Min/max over consecutive bins of `factor` samples (the last bin may be short)."""
+    starts = np.arange(0, len(mins), factor)
+    return np.minimum.reduceat(mins, starts), np.maximum.reduceat(maxs, starts)
+
+
+def level_lengths(length):
+    """(factor, length) of every downsample level of a `length`-sample timeline, finest first."""
+    levels = []
+    factor = 1
+    while length > MIN_LEVEL_LENGTH:
+        factor *= DOWNSAMPLE_FACTOR
+        length = -(-length // DOWNSAMPLE_FACTOR)
+        levels.append((factor, length))
+    return levels
+
+
+def _layout(header, sections):
+    """Assign every column its offset; returns the encoded (padded) header.
+    Offsets depend on the header size and vice versa, so settle on a header
+    that has room for its own offsets."""
+    header_size = 0
+    while True:
+        offset = _aligned(PREFIX.size + header_size)
+        for entries, columns in sections:
+            for name, (dtype, length) in columns.items():
+                entries[name] = {'dtype': dtype, 'offset': offset, 'length': length}
+                offset = _aligned(offset + np.dtype(dtype).itemsize * length)
+        encoded = json.dumps(header, separators=(',', ':')).encode()
+        if len(encoded) <= header_size:
+            return encoded.ljust(header_size)
+        header_size = len(encoded) + 64
+
+
+def _write_at(f, column, start, values):
+    """Write values into a column, starting at element `start`."""
+    values = np.ascontiguousarray(values, dtype=column['dtype'])
+    f.seek(column['offset'] + start * values.itemsize)
+    f.write(values.tobytes())
+
+
+def _map_column(f, column):
+    return np.memmap(f, dtype=column['dtype'], mode='r', offset=column['offset'], shape=(column['length'],))
+
+
+def write_timeline(path, samples, fps, sample_rate):
+    """Write timeline.bin atomically from a structured SAMPLE_DTYPE array
+    (e.g. TimelineSpool.samples()), WRITE_CHUNK samples at a time."""
+    length = len(samples)
+    columns = {'time': ('float32', length), 'frame': ('uint32', length), 'intensity': ('float32', length)}
+    for name in ZONE_NAMES:
+        columns[f'zone_{name}'] = ('float32', length)
+
+    header = {'version': VERSION, 'length': length, 'sample_rate': sample_rate,
+              'zones': list(ZONE_NAMES), 'columns': {}, 'levels': []}
+    sections = [(header['columns'], columns)]
+    for factor, level_length in level_lengths(length):
+        level = {'factor': factor, 'length': level_length, 'columns': {}}
+        header['levels'].append(level)
+        sections.append((level['columns'], {'time': ('float32', level_length),
+                                            'intensity_min': ('float32', level_length),
+                                            'intensity_max': ('float32', level_length)}))
+    encoded = _layout(header, sections)
+
+    with atomic_write(path, 'wb+') as f:
+        f.write(PREFIX.pack(MAGIC, len(encoded)))
+        f.write(encoded)
+        out = header['columns']
+        for start in range(0, length, WRITE_CHUNK):
+            chunk = samples[start:start + WRITE_CHUNK]
+            _write_at(f, out['time'], start, chunk['frame'] / fps)
+            _write_at(f, out['frame'], start, chunk['frame'])
+            _write_at(f, out['intensity'], start, chunk['intensity'])
+            for i, name in enumerate(ZONE_NAMES):
+                _write_at(f, out[f'zone_{name}'], start, chunk['zones'][:, i])
+
+        # Each level is downsampled from the previous one, read back from the file.
+        source = (out['time'], out['intensity'], out['intensity'])
+        for level in header['levels']:
+            f.flush()
+            times, mins, maxs = (_map_column(f, column) for column in source)
+            dest = level['columns']
+            for start in range(0, len(mins), WRITE_CHUNK):
+                level_mins, level_maxs = downsample_minmax(mins[start:start + WRITE_CHUNK],
+                                                           maxs[start:start + WRITE_CHUNK])
+                level_start = start // DOWNSAMPLE_FACTOR
+                _write_at(f, dest['time'], level_start, times[start:start + WRITE_CHUNK:DOWNSAMPLE_FACTOR])
+                _write_at(f, dest['intensity_min'], level_start, level_mins)
+                _write_at(f, dest['intensity_max'], level_start, level_maxs)
+            del times, mins, maxs
+            source = (dest['time'], dest['intensity_min'], dest['intensity_max'])
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        magic, header_size = PREFIX.unpack(f.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a timeline file")
+        return json.loads(f.read(header_size))
+
+
+def read_timeline(path, level=0):
+    """Memory-map the columns of a level (0 = full resolution). Returns (header, {name: array})."""
+    header = read_header(path)
+    source = header if level == 0 else header['levels'][level - 1]
+    columns = {}
+    for name, col in source['columns'].items():
+        if col['length'] == 0:
+            columns[name] = np.zeros(0, dtype=col['dtype'])
+        else:
+            columns[name] = np.memmap(path, dtype=col['dtype'], mode='r', offset=col['offset'],
+                                      shape=(col['length'],))
+    return header, columns
@@ -8,105 +8,767 @@ Computes movement analytics for repetitive pattern detection.
 import os
 import sys
 import json
+import argparse
+import asyncio
 import time
+import signal
+from datetime import datetime, timezone
 import serial
 import serial.tools.list_ports
 import threading
+import queue
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
 import cv2
 import numpy as np
 from pathlib import Path
 from PIL import Image
 
+# fpga_link/, shared with the pipeline-sobel-fpga prototype, lives at the repository root.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from fpga_link import BAUD_RATE, FrameCache, CACHE_MAX_ENTRIES, atomic_write, write_json_atomic
+from sobel_emulator import SobelEmulator, sobel_frame, BORDER_MASK, FPGA_WIDTH, FPGA_HEIGHT, FRAME_SIZE
+from streaming_analytics import StreamingAnalytics, session_periodicity, session_rhythm
+from session_watcher import SessionWatcher
+from session_checkpoint import SessionCheckpoint, source_stamp, is_sync_frame
+from motion_gate import MotionGate, DEFAULT_REFRESH_INTERVAL
+from live_capture import LiveCapture
+from ffmpeg_capture import FFmpegCapture, ffmpeg_available
+from sobel_tiling import SobelTiler, UNCHANGED
+from timeline_file import TimelineSpool, write_timeline, TIMELINE_FILE, ZONE_NAMES
+from sobel_stream import SobelStreamWriter, SOBEL_STREAM_FILE
+from worker_metrics import SessionMetrics, WorkerMetrics, NULL_METRICS, METRICS_FILE
+
 SCRIPT_DIR = Path(__file__).parent.absolute()
 SESSIONS_DIR = SCRIPT_DIR.parent / "sessions"
-POLL_INTERVAL = 5
+POLL_INTERVAL = 5  # fallback rescan period when inotify is unavailable
+# Pool process deaths a session may be caught in before it is marked as failed.
+MAX_POOL_CRASHES = 2
 
-FPGA_WIDTH, FPGA_HEIGHT = 160, 120
-BAUD_RATE = 115200
 FPGA_TIMEOUT = 5.0
 
+# How often a frame is retried after resynchronizing the stream.
+RESYNC_RETRIES = 1
+MAX_ALIGNMENT_SEARCH = 2 * FPGA_WIDTH
+
+SOBEL_BACKENDS = ('fpga', 'emulator')
+
+# How original.webm is decoded:
+#   opencv - cv2.VideoCapture at full resolution, converted per frame in Python
+#   ffmpeg - an ffmpeg process that outputs 160x120 gray directly (falls back
+#            to opencv when ffmpeg is not installed)
+DECODERS = ('opencv', 'ffmpeg')
+
+# Resolution the heatmap is accumulated at / written at:
+#   full          - upsample each Sobel frame to the recording size (original behaviour)
+#   native        - accumulate at 160x120, upsample only the colormapped output frame
+#   native-output - accumulate and write heatmap.webm at 160x120
+HEATMAP_MODES = ('full', 'native', 'native-output')
+
+# Per-frame decay of the movement heatmap.
+DECAY_RATE = 0.95
+
+# Recorded in analytics.json with the parameters it was computed with; bump it
+# whenever the analytics computation changes so reanalyze.py refreshes old sessions.
+ANALYTICS_VERSION = 3
+
+# Frames buffered between decode -> serial I/O -> heatmap -> encode stages.
+STAGE_QUEUE_SIZE = 4
+
+# Codecs (fourcc) heatmap.webm can be written with.
+HEATMAP_CODECS = {'vp8': 'VP80', 'vp9': 'VP90'}
+
+# Cheap formats the heatmap can be written in while the session runs and
+# transcoded to heatmap.webm afterwards: name -> (fourcc, file name).
+INTERMEDIATE_FORMATS = {'mjpg': ('MJPG', "heatmap.intermediate.avi")}
+
+# Per-frame presentation timestamps (ms, float64) saved next to original.webm.
+FRAME_INDEX_FILE = "frame_index.npy"
+
+# Seconds between partial analytics.json snapshots while a session is running.
+ANALYTICS_SNAPSHOT_INTERVAL = 2.0
+
+# Live mode: latest heatmap frame for the UI, and how often it is rewritten.
+LIVE_PREVIEW_FILE = "live.jpg"
+LIVE_PREVIEW_INTERVAL = 0.5
+LIVE_EMULATOR_FPS = 10.0
+
+
+def update_job_file(session_path, **updates):
+    """Merge updates into a session's job.json (atomically, the UI polls it)."""
+    job_path = session_path / "job.json"
+    
+    try:
+        with open(job_path, 'r') as f:
+            job = json.load(f)
+    except:
+        job = {}
+    
+    job.update(updates)
+    
+    write_json_atomic(job_path, job)
+
 
 def discover_serial_port():
     """Auto-discover available serial port for FPGA."""
+    ports = discover_serial_ports()
+    return ports[0] if ports else None
+
+
+def discover_serial_ports():
+    """All USB/ACM serial ports that may have a board attached (first port as a fallback)."""
     ports = serial.tools.list_ports.comports()
     if not ports:
+        return []
+    matches = [port.device for port in ports
+               if 'USB' in port.device or 'ttyUSB' in port.device or 'ttyACM' in port.device]
+    return matches or [ports[0].device]
+
+
+# Bytes kernel_sobel.v forces to black in every returned frame (rows 0 and
+# HEIGHT-1, and the last two columns once the output counter lag is applied).
+# A stream that slipped by even one byte moves image data into them.
+ALIGNMENT_INDEX = np.flatnonzero(BORDER_MASK)
+
+
+def frame_is_aligned(frame):
+    """True if a received frame has the zero-border signature of an aligned frame."""
+    return not np.frombuffer(frame, dtype=np.uint8)[ALIGNMENT_INDEX].any()
+
+
+def find_frame_offset(data, max_offset=MAX_ALIGNMENT_SEARCH):
+    """Smallest byte offset into data where a frame with the zero-border signature
+    starts, or None if none does within max_offset."""
+    data = np.frombuffer(data, dtype=np.uint8)
+    count = min(len(data) - FRAME_SIZE, max_offset) + 1
+    if count <= 0:
         return None
-    for port in ports:
-        if 'USB' in port.device or 'ttyUSB' in port.device or 'ttyACM' in port.device:
-            return port.device
-    return ports[0].device
+    windows = np.lib.stride_tricks.sliding_window_view(data, FRAME_SIZE)[:count]
+    aligned = ~windows[:, ALIGNMENT_INDEX].any(axis=1)
+    offsets = np.flatnonzero(aligned)
+    return int(offsets[0]) if offsets.size else None
+
 
+def verification_frame():
+    """Deterministic diagonal-stripe frame used to verify a board responds."""
+    rows, cols = np.indices((FPGA_HEIGHT, FPGA_WIDTH))
+    return (((rows + cols) * 8) % 256).astype(np.uint8).tobytes()
 
-class FPGATransceiver:
-    """Handles serial communication with the FPGA for Sobel filtering."""
+
+class FPGAPool:
+    """The set of responsive Sobel devices that frames are sharded across."""
     
-    def __init__(self, port, baud=115200):
-        self.ser = serial.Serial(port, baud, timeout=0.1)
-        self.running = True
-        self.img_buffer = bytearray()
-        self.img_size = FPGA_WIDTH * FPGA_HEIGHT
-        self.lock = threading.Lock()
+    def __init__(self, devices):
+        self.devices = list(devices)
+    
+    @classmethod
+    async def open(cls, ports, baud=BAUD_RATE):
+        """Open every port and keep the boards that answer a test frame."""
+        # Only the FPGA backend needs the serial link; the emulator never gets here.
+        from fpga_link import SerialLink
         
-        self.thread = threading.Thread(target=self._listen, daemon=True)
-        self.thread.start()
-
-    def _listen(self):
-        while self.running:
+        devices = []
+        for port in ports:
+            print(f"Connecting to FPGA on {port}...")
             try:
-                if self.ser.in_waiting:
-                    chunk = self.ser.read(self.ser.in_waiting)
-                    with self.lock:
-                        self.img_buffer.extend(chunk)
+                device = SerialLink(port, baud)
             except Exception as e:
-                print(f"Serial error: {e}")
-                break
-            time.sleep(0.001)
-
-    def send_frame(self, frame_bytes):
-        """Send a frame to the FPGA."""
-        self.ser.write(frame_bytes)
-
-    def receive_frame(self, timeout=FPGA_TIMEOUT):
-        """Wait for a complete frame from the FPGA. Returns bytes or None on timeout."""
-        start = time.time()
-        while time.time() - start < timeout:
-            with self.lock:
-                if len(self.img_buffer) >= self.img_size:
-                    frame_data = bytes(self.img_buffer[:self.img_size])
-                    self.img_buffer = self.img_buffer[self.img_size:]
-                    return frame_data
-            time.sleep(0.01)
+                print(f"  {port}: could not open ({e})")
+                continue
+            devices.append(device)
+        # The boards are verified concurrently on the loop.
+        answered = await asyncio.gather(*(cls.verify(device) for device in devices))
+        for device, ok in zip(devices, answered):
+            if not ok:
+                device.close()
+        return cls(device for device, ok in zip(devices, answered) if ok)
+    
+    @staticmethod
+    async def verify(device):
+        """Send a test frame and check a full, bordered Sobel frame comes back."""
+        test_frame = verification_frame()
+        device.clear_buffer()
+        await device.send_frame(test_frame)
+        response = await device.receive_frame(timeout=FPGA_TIMEOUT)
+        if response is None or not frame_is_aligned(response):
+            # The board may still hold part of a frame from an earlier run.
+            print(f"  {device.port}: no clean response to test frame, resynchronizing")
+            if await device.resync():
+                await device.send_frame(test_frame)
+                response = await device.receive_frame(timeout=FPGA_TIMEOUT)
+        if response is None or not frame_is_aligned(response):
+            print(f"  {device.port}: no response to test frame, skipping")
+            return False
+        
+        response = bytes(response)
+        if response != sobel_frame(test_frame):
+            print(f"  {device.port}: warning, test frame differs from the emulator model")
+        print(f"  {device.port}: OK")
+        return True
+    
+    def remove(self, device):
+        """Drop a board that stopped responding."""
+        if device in self.devices:
+            self.devices.remove(device)
+        device.close()
+    
+    def clear_buffer(self):
+        for device in list(self.devices):
+            device.clear_buffer()
+    
+    def close(self):
+        for device in list(self.devices):
+            device.close()
+        self.devices = []
+
+
+class FrameDispatcher:
+    """Shards frames across a pool, one coroutine per device, and re-emits them in order.
+    
+    Each device pulls the next frame as soon as it is free, so faster boards
+    take more of the load. A device that times out is removed from the pool
+    and its frame is retried on the others. Frames found in the cache are
+    never sent.
+    
+    All devices are driven from one event loop; the decode and render stages
+    stay on their threads and are reached through their queues.
+    """
+    
+    def __init__(self, pool, tx_queue, render_queue, stop, cache=None, first_frame=0):
+        self.pool = pool
+        self.cache = cache
+        self.tx_queue = tx_queue
+        self.render_queue = render_queue
+        self.stop = stop
+        self.first_frame = first_frame
+        
+        self.max_pending = STAGE_QUEUE_SIZE + len(pool.devices)
+        self.changed = asyncio.Event()
+        self.retry = deque()
+        self.results = {}
+        self.in_flight = 0
+        self.input_done = False
+        self.last_timeout = None
+    
+    async def run(self):
+        """Dispatch until the input ends. Returns an error message, or None on success."""
+        tasks = [asyncio.create_task(self._device_loop(device)) for device in list(self.pool.devices)]
+        try:
+            return await self._emit_in_order(tasks)
+        finally:
+            self.input_done = True
+            self._notify()
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    print(f"Device loop failed: {result!r}")
+    
+    def _notify(self):
+        """Wake every coroutine waiting in _wait()."""
+        self.changed.set()
+        self.changed = asyncio.Event()
+    
+    async def _wait(self, timeout=0.1):
+        """Until the dispatcher state changes; the timeout is for noticing `stop`."""
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _emit_in_order(self, tasks):
+        next_idx = self.first_frame
+        while not self.stop.is_set():
+            if next_idx in self.results:
+                response = self.results.pop(next_idx)
+                self._notify()
+            elif self._finished():
+                return None
+            elif all(task.done() for task in tasks):
+                self.stop.set()
+                return f"FPGA timeout at frame {self.last_timeout}"
+            else:
+                await self._wait()
+                continue
+            
+            if not await _put_async(self.render_queue, (next_idx, response), self.stop):
+                return None
+            next_idx += 1
+        return None
+    
+    def _finished(self):
+        return self.input_done and self.in_flight == 0 and not self.retry and not self.results
+    
+    async def _next_frame(self):
+        while not self.stop.is_set():
+            if self.retry:
+                self.in_flight += 1
+                return self.retry.popleft()
+            if self.input_done:
+                if self.in_flight == 0:
+                    return _END
+                await self._wait()
+                continue
+            # Bound the reorder buffer when rendering is the bottleneck.
+            if len(self.results) + self.in_flight >= self.max_pending:
+                await self._wait()
+                continue
+            
+            try:
+                item = self.tx_queue.get_nowait()
+            except queue.Empty:
+                try:
+                    item = await asyncio.to_thread(self.tx_queue.get, timeout=0.1)
+                except queue.Empty:
+                    continue
+            if item is _END:
+                self.input_done = True
+                self._notify()
+                continue
+            cached = None
+            if item[1] is _REUSE_PREVIOUS:
+                cached = _REUSE_PREVIOUS
+            elif self.cache is not None and not isinstance(item[1], list):
+                cached = self.cache.get(item[1])
+            if cached is not None:
+                self.results[item[0]] = cached
+                self._notify()
+                continue
+            self.in_flight += 1
+            return item
+        return _END
+    
+    async def _exchange(self, device, frame_idx, fpga_input):
+        """Send one frame and receive its result, resyncing the stream on a
+        timeout or a misaligned answer. Returns None if the board gave up."""
+        # The board answers with exactly one frame, so anything left over from
+        # the previous exchange means the stream slipped.
+        stray = device.pending_bytes()
+        if stray:
+            print(f"\nBoard {device.port}: {len(stray)} stray byte(s) before frame {frame_idx}, resynchronizing")
+            if not await device.resync():
+                return None
+        
+        for attempt in range(RESYNC_RETRIES + 1):
+            await device.send_frame(fpga_input)
+            fpga_response = await device.receive_frame(timeout=FPGA_TIMEOUT)
+            
+            if (fpga_response is not None and frame_is_aligned(fpga_response)
+                    and not await device.has_stray_bytes()):
+                return fpga_response
+            if attempt == RESYNC_RETRIES:
+                return None
+            
+            if fpga_response is None:
+                problem = "timeout"
+            elif frame_is_aligned(fpga_response):
+                problem = f"{len(device.pending_bytes())} stray byte(s) after the frame"
+            else:
+                offset = find_frame_offset(bytes(fpga_response) + device.pending_bytes())
+                problem = "misaligned" if offset is None else f"misaligned by {offset} byte(s)"
+            print(f"\nBoard {device.port}: frame {frame_idx} {problem}, resynchronizing")
+            if not await device.resync():
+                return None
         return None
+    
+    async def _exchange_tiles(self, device, frame_idx, tiles):
+        """Exchange every tile of a tiled frame on one board; UNCHANGED tiles and
+        cached ones are not sent. Returns the results, or None if the board gave up."""
+        results = []
+        for tile in tiles:
+            if tile is UNCHANGED:
+                results.append(tile)
+                continue
+            result = self.cache.get(tile) if self.cache is not None else None
+            if result is None:
+                response = await self._exchange(device, frame_idx, tile)
+                if response is None:
+                    return None
+                result = bytes(response)
+                if self.cache is not None:
+                    self.cache.put(tile, result)
+            results.append(result)
+        return results
+    
+    async def _device_loop(self, device):
+        while True:
+            item = await self._next_frame()
+            if item is _END:
+                return
+            frame_idx, fpga_input = item
+            
+            tiled = isinstance(fpga_input, list)
+            if tiled:
+                fpga_response = await self._exchange_tiles(device, frame_idx, fpga_input)
+            else:
+                fpga_response = await self._exchange(device, frame_idx, fpga_input)
+            
+            self.in_flight -= 1
+            if fpga_response is None:
+                self.last_timeout = frame_idx
+                self.retry.appendleft(item)
+            elif not tiled:
+                # The link recycles its ring slot on the next receive.
+                fpga_response = bytes(fpga_response)
+            if fpga_response is not None:
+                self.results[frame_idx] = fpga_response
+            self._notify()
+            
+            if fpga_response is not None and self.cache is not None and not tiled:
+                self.cache.put(fpga_input, fpga_response)
+            
+            if fpga_response is None:
+                print(f"\nBoard {device.port} timed out at frame {frame_idx}; removing it from the pool")
+                self.pool.remove(device)
+                return
 
-    def clear_buffer(self):
-        """Clear any pending data in the buffer."""
+_END = None
+
+# Sent through the pipeline in place of a frame the motion gate skipped: the
+# render stage reuses the previous Sobel result for it. (Tiled frames travel
+# as a list of tile inputs instead, see sobel_tiling.py.)
+_REUSE_PREVIOUS = object()
+
+
+def _decode_state(gate, tiler):
+    """Checkpoint state of the decode side (motion gate, last tile inputs) after a
+    frame: (JSON-safe state, the raw frame data its offsets point into)."""
+    state, data = {}, bytearray()
+    if gate is not None:
+        state['gate'] = gate.state(data)
+    if tiler is not None:
+        state['tiler'] = tiler.split_state(data)
+    return state, bytes(data)
+
+
+def _put(q, item, stop):
+    """Put into a bounded queue, giving up once the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+async def _put_async(q, item, stop):
+    """_put from the event loop: straight in if there is room, else wait on a thread."""
+    try:
+        q.put_nowait(item)
+        return True
+    except queue.Full:
+        return await asyncio.to_thread(_put, q, item, stop)
+
+
+def _get(q, stop):
+    """Get from a queue, returning _END once the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+class StageThread(threading.Thread):
+    """Runs one pipeline stage; an exception stops the whole pipeline."""
+    
+    def __init__(self, name, stop, target, *args):
+        super().__init__(name=name, daemon=True)
+        self.stop = stop
+        self.target = target
+        self.args = args
+        self.error = None
+    
+    def run(self):
+        try:
+            self.target(*self.args)
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+
+
+class LiveFrameSource:
+    """Takes the place of the decode stage and its queue in live mode.
+    
+    A frame is only captured and converted when a board asks for one (the
+    dispatcher's tx_queue.get), so it is never older than the exchange it
+    goes into; frames the camera delivers in between are dropped by
+    LiveCapture.
+    """
+    
+    def __init__(self, capture, convert, timestamps, metrics=NULL_METRICS):
+        self.capture = capture
+        self.convert = convert
+        self.timestamps = timestamps
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.next_idx = 0
+        self.ended = False
+    
+    def get_nowait(self):
+        # Capturing waits for the next frame to be due, so it always goes through get().
+        raise queue.Empty
+    
+    def get(self, timeout=None):
         with self.lock:
-            self.img_buffer = bytearray()
+            if self.ended:
+                return _END
+            with self.metrics.time('decode'):
+                ret, frame = self.capture.read()
+            if not ret:
+                self.ended = True
+                return _END
+            self.timestamps.append(self.capture.get(cv2.CAP_PROP_POS_MSEC))
+            with self.metrics.time('convert'):
+                item = (self.next_idx, self.convert(frame))
+            self.next_idx += 1
+            return item
 
+
+class HeatmapRenderer:
+    """Accumulates Sobel frames into the decaying movement heatmap and timeline.
+    
+    width/height is the accumulation resolution; frames are written at
+    output_size and the recording is reported as source_size (both default
+    to the accumulation resolution). With out=None only the analytics are
+    computed. The timeline samples are spooled to a temporary file, so memory
+    does not grow with the session; close() releases it.
+    """
+    
+    def __init__(self, width, height, fps, out, compute_hot_zones, decay_rate=DECAY_RATE,
+                 output_size=None, source_size=None, metrics=NULL_METRICS, preview_path=None):
+        self.width = width
+        self.height = height
+        self.output_size = output_size or (width, height)
+        self.source_size = source_size or (width, height)
+        self.fps = fps
+        self.out = out
+        self.compute_hot_zones = compute_hot_zones
+        self.decay_rate = decay_rate
+        self.metrics = metrics
+        self.preview_path = preview_path
+        self.last_preview = 0.0
+        
+        self.heatmap_accumulator = np.zeros((height, width), dtype=np.float32)
+        self.total_accumulated = np.zeros((height, width), dtype=np.float64)
+        self.previous_sobel = None
+        self.frame_count = 0
+        
+        # Timeline samples, one every sample_interval frames.
+        self.timeline = TimelineSpool()
+        self.peak_intensity = 0
+        self.peak_frame = 0
+        
+        self.sample_interval = max(1, int(fps / 10))
+        self.analytics = StreamingAnalytics(fps / self.sample_interval)
+    
+    def push(self, sobel):
+        """Fold one full-resolution Sobel frame in and write the heatmap frame."""
+        with self.metrics.time('heatmap'):
+            self._accumulate(sobel)
+        
+        if self.out is None:
+            self.frame_count += 1
+            return
+        
+        with self.metrics.time('colormap'):
+            norm_heatmap = cv2.normalize(self.heatmap_accumulator, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+            visual_heatmap = cv2.applyColorMap(norm_heatmap, cv2.COLORMAP_INFERNO)
+            if self.output_size != (self.width, self.height):
+                visual_heatmap = cv2.resize(visual_heatmap, self.output_size, interpolation=cv2.INTER_LINEAR)
+        
+        # Only the hand-off; the encoding itself is timed by HeatmapWriter.
+        with self.metrics.time('encode_wait'):
+            self.out.write(visual_heatmap)
+        
+        if self.preview_path is not None and time.monotonic() - self.last_preview >= LIVE_PREVIEW_INTERVAL:
+            self._write_preview(visual_heatmap)
+        
+        self.frame_count += 1
+    
+    def _write_preview(self, visual_heatmap):
+        """Replace the live preview JPEG atomically (the UI reloads it while we write)."""
+        ok, encoded = cv2.imencode('.jpg', visual_heatmap)
+        if ok:
+            with atomic_write(self.preview_path) as f:
+                f.write(encoded.tobytes())
+        self.last_preview = time.monotonic()
+    
+    def _accumulate(self, sobel):
+        """Decay/accumulate the frame delta and sample the timelines."""
+        frame_idx = self.frame_count
+        
+        if self.previous_sobel is not None:
+            delta = cv2.absdiff(sobel, self.previous_sobel).astype(np.float32)
+            self.heatmap_accumulator = (self.heatmap_accumulator * self.decay_rate) + delta
+            self.total_accumulated += delta
+        
+        self.previous_sobel = sobel
+        
+        frame_intensity = float(np.mean(self.heatmap_accumulator))
+        
+        if frame_idx % self.sample_interval == 0:
+            intensity = round(frame_intensity, 2)
+            self.analytics.add_sample(intensity)
+            zone_snapshot = self.compute_hot_zones(self.heatmap_accumulator, self.height, self.width)
+            self.timeline.append(frame_idx, intensity, [zone_snapshot[name] for name in ZONE_NAMES])
+        
+        if frame_intensity > self.peak_intensity:
+            self.peak_intensity = frame_intensity
+            self.peak_frame = frame_idx
+    
     def close(self):
-        self.running = False
-        self.thread.join(timeout=1.0)
-        self.ser.close()
+        self.timeline.close()
+
+
+class HeatmapWriter:
+    """VideoWriter whose encoding runs on its own thread, fed by a bounded
+    queue, so encoder stalls do not hold up the render stage (and through it
+    the serial link)."""
+    
+    def __init__(self, path, fourcc, fps, size, metrics=NULL_METRICS, queue_size=STAGE_QUEUE_SIZE):
+        self.writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        self.metrics = metrics
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = None
+        if self.writer.isOpened():
+            self.thread = threading.Thread(target=self._encode, name="encode", daemon=True)
+            self.thread.start()
+    
+    def isOpened(self):
+        return self.writer.isOpened()
+    
+    def write(self, frame):
+        if self.error is not None:
+            raise RuntimeError(f"heatmap encoder failed: {self.error}")
+        self.queue.put(frame)
+    
+    def _encode(self):
+        while True:
+            frame = self.queue.get()
+            if frame is _END:
+                return
+            if self.error is not None:
+                continue  # keep draining so write() never blocks forever
+            try:
+                with self.metrics.time('encode'):
+                    self.writer.write(frame)
+            except Exception as e:
+                self.error = e
+    
+    def release(self):
+        """Encode everything queued, then close the file."""
+        if self.thread is not None:
+            self.queue.put(_END)
+            self.thread.join()
+            self.thread = None
+        self.writer.release()
+
+
+def transcode_video(src_path, dst_path, fourcc, fps):
+    """Re-encode a video file with another codec. Returns the number of frames."""
+    cap = cv2.VideoCapture(str(src_path))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    out = HeatmapWriter(dst_path, fourcc, fps, (width, height))
+    if not out.isOpened():
+        cap.release()
+        raise RuntimeError(f"could not create {dst_path.name}")
+    
+    frames = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+            frames += 1
+    finally:
+        cap.release()
+        out.release()
+    if out.error is not None:
+        raise RuntimeError(f"heatmap encoder failed: {out.error}")
+    return frames
 
 
 class JobProcessor:
-    def __init__(self):
+    def __init__(self, backend='fpga', cache=None, heatmap_mode='full', frame_index=False, ports=None,
+                 checkpoint=True, metrics=False, metrics_file=None, heatmap_size=None,
+                 heatmap_codec='vp8', intermediate=None, defer_transcode=False,
+                 motion_threshold=0.0, refresh_interval=DEFAULT_REFRESH_INTERVAL, decay_rate=DECAY_RATE,
+                 sobel_stream=True, decoder='opencv', tiled_size=None, tile_threshold=0.0):
+        if backend not in SOBEL_BACKENDS:
+            raise ValueError(f"Unknown Sobel backend: {backend}")
+        if heatmap_mode not in HEATMAP_MODES:
+            raise ValueError(f"Unknown heatmap mode: {heatmap_mode}")
+        if heatmap_codec not in HEATMAP_CODECS:
+            raise ValueError(f"Unknown heatmap codec: {heatmap_codec}")
+        if intermediate is not None and intermediate not in INTERMEDIATE_FORMATS:
+            raise ValueError(f"Unknown intermediate format: {intermediate}")
+        if decoder not in DECODERS:
+            raise ValueError(f"Unknown decoder: {decoder}")
+        if tiled_size is not None and motion_threshold > 0:
+            raise ValueError("The motion gate and tiling cannot be combined; tiling skips unchanged tiles itself")
+        if decoder == 'ffmpeg' and not ffmpeg_available():
+            print("ffmpeg not found; decoding with OpenCV.")
+            decoder = 'opencv'
+        self.backend = backend
+        self.cache = cache
+        self.heatmap_mode = heatmap_mode
+        self.frame_index = frame_index
+        self.ports = ports
+        self.checkpoint = checkpoint
+        self.heatmap_size = heatmap_size
+        self.heatmap_codec = heatmap_codec
+        self.intermediate = intermediate
+        self.motion_threshold = motion_threshold
+        self.refresh_interval = refresh_interval
+        self.decay_rate = decay_rate
+        self.sobel_stream = sobel_stream
+        self.decoder = decoder
+        # Resolution the Sobel runs at: the board's own, or larger as tiles.
+        self.tiled_size = tiled_size
+        self.tile_threshold = tile_threshold
+        self.sobel_size = tiled_size or (FPGA_WIDTH, FPGA_HEIGHT)
         self.fpga = None
-        self.serial_port = None
+        # The boards' serial links live on this loop; it runs while a session
+        # (or the connection check) drives them.
+        self.loop = asyncio.new_event_loop()
+        
+        # With an intermediate format, the transcode to heatmap.webm runs on
+        # this thread (deferred) while the boards move on to the next session.
+        self.transcoder = ThreadPoolExecutor(max_workers=1) if intermediate and defer_transcode else None
+        
+        # Per-session timers (metrics.json); a metrics file also turns them on.
+        self.collect_metrics = metrics or metrics_file is not None
+        self.worker_metrics = WorkerMetrics(Path(metrics_file)) if metrics_file else None
+        self.metrics = NULL_METRICS
     
     def connect_fpga(self):
-        """Connect to the FPGA. Raises exception on failure."""
-        if self.fpga is not None:
+        """Connect to every FPGA (or the emulator). Raises exception on failure."""
+        if self.fpga is not None and self.fpga.devices:
+            return
+        
+        if self.backend == 'emulator':
+            print("Using software Sobel emulator (no FPGA).")
+            self.fpga = FPGAPool([SobelEmulator()])
             return
         
-        self.serial_port = discover_serial_port()
-        if not self.serial_port:
+        ports = self.ports or discover_serial_ports()
+        if not ports:
             raise RuntimeError("No serial ports found. Is the FPGA connected?")
         
-        print(f"Connecting to FPGA on {self.serial_port}...")
-        self.fpga = FPGATransceiver(self.serial_port, BAUD_RATE)
+        self.fpga = self.loop.run_until_complete(FPGAPool.open(ports, BAUD_RATE))
+        if not self.fpga.devices:
+            self.fpga = None
+            raise RuntimeError(f"No FPGA answered on {', '.join(ports)}")
         self.fpga.clear_buffer()
-        print("FPGA connected.")
+        print(f"FPGA connected ({len(self.fpga.devices)} board(s)).")
 
     def disconnect_fpga(self):
         """Disconnect from the FPGA."""
@@ -114,21 +776,54 @@ class JobProcessor:
             self.fpga.close()
             self.fpga = None
     
+    def close(self):
+        """Finish pending transcodes and release the boards."""
+        if self.transcoder is not None:
+            self.transcoder.shutdown(wait=True)
+        self.disconnect_fpga()
+        self.loop.close()
+    
+    def open_video(self, video_path, fps):
+        """VideoCapture-like reader of a recording, per the decoder option."""
+        if self.decoder == 'ffmpeg':
+            return FFmpegCapture(video_path, fps, self.sobel_size)
+        return cv2.VideoCapture(str(video_path))
+    
     def frame_to_fpga_format(self, frame):
-        """Convert BGR frame to 160x120 grayscale bytes for FPGA."""
+        """Convert BGR frame to 160x120 grayscale bytes for FPGA.
+        Frames the ffmpeg decoder already delivers at that format are only copied out."""
+        if frame.ndim == 2 and frame.shape == (FPGA_HEIGHT, FPGA_WIDTH):
+            return frame.tobytes()
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         resized = cv2.resize(gray, (FPGA_WIDTH, FPGA_HEIGHT))
         return resized.tobytes()
     
+    def make_gate(self):
+        """A fresh MotionGate for one session, or None if every frame is sent."""
+        if self.motion_threshold <= 0:
+            return None
+        return MotionGate(self.motion_threshold, self.refresh_interval)
+    
+    def make_tiler(self):
+        """A fresh SobelTiler for one session, or None if the Sobel runs untiled."""
+        if self.tiled_size is None:
+            return None
+        return SobelTiler(*self.tiled_size, threshold=self.tile_threshold)
+    
     def fpga_response_to_frame(self, data, target_width, target_height):
-        """Convert FPGA response bytes to a frame at target resolution."""
-        small_frame = np.frombuffer(data, dtype=np.uint8).reshape((FPGA_HEIGHT, FPGA_WIDTH))
-        if target_width != FPGA_WIDTH or target_height != FPGA_HEIGHT:
+        """Convert FPGA response bytes (stitched, when tiled) to a frame at target resolution."""
+        sobel_width, sobel_height = self.sobel_size
+        small_frame = np.frombuffer(data, dtype=np.uint8).reshape((sobel_height, sobel_width))
+        if target_width != sobel_width or target_height != sobel_height:
             return cv2.resize(small_frame, (target_width, target_height), interpolation=cv2.INTER_LINEAR)
         return small_frame
 
     def get_video_info(self, video_path):
-        """Get video dimensions and FPS. WebM from MediaRecorder often has bad metadata."""
+        """Get video dimensions, FPS and frame count without decoding the video.
+        
+        WebM from MediaRecorder often has bad metadata; a missing frame count is
+        estimated (see estimate_frame_count) and corrected when the session ends.
+        """
         cap = cv2.VideoCapture(str(video_path))
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -140,80 +835,85 @@ class JobProcessor:
             fps = reported_fps
         
         reported_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        if reported_count <= 0:
-            frame_count = 0
-            while True:
-                ret, _ = cap.read()
-                if not ret:
-                    break
-                frame_count += 1
-        else:
-            frame_count = reported_count
-        
         cap.release()
+        
+        if reported_count > 0:
+            frame_count = reported_count
+        else:
+            frame_count = self.estimate_frame_count(Path(video_path).parent, fps)
         return width, height, fps, frame_count
     
-    def update_job(self, session_path, **updates):
-        """Update job.json with new values."""
-        job_path = session_path / "job.json"
+    def estimate_frame_count(self, session_path, fps):
+        """Frame count from an earlier pass's frame index, else the recorded duration (0 if unknown)."""
+        index_path = session_path / FRAME_INDEX_FILE
+        if index_path.exists():
+            try:
+                return len(np.load(index_path, mmap_mode='r'))
+            except (OSError, ValueError):
+                pass
         
         try:
-            with open(job_path, 'r') as f:
-                job = json.load(f)
+            with open(session_path / "job.json", 'r') as f:
+                duration = json.load(f).get('recorded_duration')
         except:
-            job = {}
-        
-        job.update(updates)
-        
-        with open(job_path, 'w') as f:
-            json.dump(job, f, indent=2)
+            duration = None
+        return int(round(duration * fps)) if duration else 0
     
-    def compute_periodicity(self, intensity_values, fps):
-        """Compute dominant frequency using FFT."""
-        if len(intensity_values) < 10:
-            return None, None
-        
-        signal = np.array(intensity_values)
-        signal = signal - np.mean(signal)
-        
-        fft = np.abs(np.fft.rfft(signal))
-        freqs = np.fft.rfftfreq(len(signal), 1.0 / fps)
-        
-        if len(fft) < 2:
-            return None, None
-        
-        fft[0] = 0
-        
-        peak_idx = np.argmax(fft)
-        dominant_freq = freqs[peak_idx]
-        
-        if dominant_freq > 0:
-            return float(dominant_freq), float(fft[peak_idx])
-        return None, None
+    def save_frame_index(self, session_path, timestamps):
+        """Write the per-frame timestamps (ms) of original.webm for later passes."""
+        with atomic_write(session_path / FRAME_INDEX_FILE) as f:
+            np.save(f, np.array(timestamps, dtype=np.float64))
     
-    def compute_rhythm_regularity(self, intensity_values, threshold_percentile=75):
-        """Compute regularity of movement cycles."""
-        if len(intensity_values) < 20:
-            return None, 0
-        
-        signal = np.array(intensity_values)
-        threshold = np.percentile(signal, threshold_percentile)
-        
-        peaks = []
-        for i in range(1, len(signal) - 1):
-            if signal[i] > threshold and signal[i] > signal[i-1] and signal[i] > signal[i+1]:
-                peaks.append(i)
-        
-        if len(peaks) < 2:
-            return None, len(peaks)
-        
-        intervals = np.diff(peaks)
-        if len(intervals) > 0:
-            regularity = 1.0 - (np.std(intervals) / np.mean(intervals)) if np.mean(intervals) > 0 else 0
-            regularity = max(0, min(1, regularity))
-            return float(regularity), len(peaks)
-        
-        return None, len(peaks)
+    def heatmap_sizes(self, width, height):
+        """(accumulation size, output size) of the heatmap for a width x height recording."""
+        if self.heatmap_mode == 'full':
+            accum_size = output_size = (width, height)
+        else:
+            accum_size = self.sobel_size
+            output_size = accum_size if self.heatmap_mode == 'native-output' else (width, height)
+        if self.heatmap_size:
+            output_size = self.heatmap_size
+        return accum_size, output_size
+    
+    def analysis_params(self):
+        """What analytics.json depends on besides the recording (its 'analysis' entry)."""
+        return {
+            'version': ANALYTICS_VERSION,
+            'decay_rate': self.decay_rate,
+            'heatmap_mode': self.heatmap_mode,
+            'decoder': self.decoder,
+            'motion_threshold': self.motion_threshold,
+            'refresh_interval': self.refresh_interval,
+            'tiled_size': list(self.tiled_size) if self.tiled_size else None,
+            'tile_threshold': self.tile_threshold,
+        }
+    
+    def stream_meta(self, gate, tiler):
+        """What sobel.bin records besides the frames: the settings they were
+        produced with and the gate/tiler stats, which a replay cannot recompute."""
+        meta = {'decoder': self.decoder, 'motion_threshold': self.motion_threshold,
+                'refresh_interval': self.refresh_interval, 'tile_threshold': self.tile_threshold}
+        if gate is not None:
+            meta['motion_gate'] = gate.stats()
+        if tiler is not None:
+            meta['tiling'] = tiler.stats()
+        return meta
+    
+    def checkpoint_settings(self):
+        """What the checkpointed Sobel frames depend on besides the recording; a
+        checkpoint written with other settings is started over instead of resumed."""
+        return {
+            'decoder': self.decoder,
+            'motion_threshold': self.motion_threshold,
+            'refresh_interval': self.refresh_interval,
+            'tiled_size': list(self.tiled_size) if self.tiled_size else None,
+            'tile_threshold': self.tile_threshold,
+        }
+    
+    def update_job(self, session_path, **updates):
+        """Update job.json with new values."""
+        with self.metrics.time('job_io'):
+            update_job_file(session_path, **updates)
     
     def compute_hot_zones(self, heatmap, height, width):
         """Analyze which regions have the most movement."""
@@ -242,8 +942,199 @@ class JobProcessor:
         
         return zone_percentages
     
-    def process_session(self, session_path):
-        """Process a single session: FPGA Sobel filter + movement heatmap + analytics."""
+    def partial_analytics(self, renderer):
+        """analytics.json snapshot of a session still in progress, from the streaming engine."""
+        engine = renderer.analytics
+        fps = renderer.fps
+        window = len(engine.window)
+        first_sample = engine.sample_count - window
+        dominant_freq, _ = engine.periodicity()
+        rhythm_regularity = engine.rhythm_regularity()
+        
+        threshold = np.percentile(engine.window, 75) if engine.window else 0
+        active_area = float(np.mean(renderer.total_accumulated > threshold)) * 100
+        
+        return {
+            'partial': True,
+            'duration_seconds': round(renderer.frame_count / fps, 2),
+            'total_frames': renderer.frame_count,
+            'fps': round(fps, 2),
+            'resolution': {'width': renderer.source_size[0], 'height': renderer.source_size[1]},
+            'fpga_resolution': {'width': FPGA_WIDTH, 'height': FPGA_HEIGHT},
+            'intensity': {
+                'average': round(engine.average(), 2),
+                'peak': round(renderer.peak_intensity, 2),
+                'peak_time': round(renderer.peak_frame / fps, 2),
+                'peak_frame': renderer.peak_frame
+            },
+            'repetition': {
+                'dominant_frequency_hz': round(dominant_freq, 3) if dominant_freq else None,
+                'cycles_per_minute': round(dominant_freq * 60, 1) if dominant_freq else None,
+                'cycle_count': engine.cycle_count,
+                'rhythm_regularity': round(rhythm_regularity, 2) if rhythm_regularity else None
+            },
+            'hot_zones': self.compute_hot_zones(renderer.total_accumulated, renderer.height, renderer.width),
+            'active_area_percent': round(active_area, 1),
+            # Only the periodicity window; the full timelines go to timeline.bin at the end.
+            'timeline': [{'frame': frame, 'time': round(frame / fps, 2), 'intensity': intensity}
+                         for frame, intensity in zip(
+                             range(first_sample * renderer.sample_interval, renderer.frame_count,
+                                   renderer.sample_interval),
+                             engine.window)]
+        }
+    
+    def _decode_stage(self, cap, tx_queue, stop, timestamps=None, first_frame=0, gate=None, tiler=None,
+                      states=None):
+        """Decode frames and pre-convert them (or split them into tiles) while the
+        board is busy. Frames before first_frame (already in the checkpoint) are
+        only skipped; frames the motion gate rejects go down the pipeline as
+        _REUSE_PREVIOUS. On checkpoint sync frames the gate and tiler state is
+        left in `states` for the render stage to save with that frame."""
+        metrics = self.metrics
+        frame_idx = 0
+        while not stop.is_set():
+            with metrics.time('decode'):
+                if frame_idx < first_frame:
+                    ret, frame = cap.grab(), None
+                else:
+                    ret, frame = cap.read()
+            if not ret:
+                break
+            if timestamps is not None:
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+            if frame is not None:
+                with metrics.time('convert'):
+                    fpga_input = tiler.split(frame) if tiler is not None else self.frame_to_fpga_format(frame)
+                if gate is not None:
+                    with metrics.time('gate'):
+                        send = gate.should_send(fpga_input)
+                    if not send:
+                        metrics.count('gated_frames')
+                        fpga_input = _REUSE_PREVIOUS
+                if states is not None and is_sync_frame(frame_idx):
+                    states[frame_idx] = _decode_state(gate, tiler)
+                if not _put(tx_queue, (frame_idx, fpga_input), stop):
+                    return
+            frame_idx += 1
+        _put(tx_queue, _END, stop)
+    
+    def _sobel_stage(self, tx_queue, render_queue, stop, first_frame=0):
+        """Drive the serial link(s). Returns an error message, or None on success."""
+        dispatcher = FrameDispatcher(self.fpga, tx_queue, render_queue, stop, self.cache, first_frame)
+        return self.loop.run_until_complete(dispatcher.run())
+    
+    def _render_stage(self, renderer, render_queue, stop, session_path, total_frames, checkpoint=None,
+                      stream=None, tiler=None, states=None):
+        """Fold Sobel frames into the heatmap and encode it, one frame behind the link.
+        Tiled frames are stitched first. Checkpointed frames are replayed from the
+        Sobel stream first; new ones are appended to it as they arrive, and the
+        checkpoint is saved every CHECKPOINT_SYNC_FRAMES of them."""
+        analytics_file = session_path / "analytics.json"
+        metrics = self.metrics
+        last_snapshot = time.monotonic()
+        
+        def sobel_frames():
+            previous = None
+            if checkpoint is not None:
+                for item in enumerate(checkpoint.replay()):
+                    if stop.is_set():
+                        return
+                    metrics.count('replayed_frames')
+                    previous = item[1]
+                    yield item
+            while True:
+                item = _get(render_queue, stop)
+                if item is _END:
+                    return
+                if item[1] is _REUSE_PREVIOUS:
+                    item = (item[0], previous)
+                elif tiler is not None:
+                    with metrics.time('stitch'):
+                        item = (item[0], tiler.stitch(item[1]))
+                previous = item[1]
+                if stream is not None:
+                    stream.append(item[1])
+                if checkpoint is not None and is_sync_frame(item[0]):
+                    with metrics.time('checkpoint'):
+                        state, data = states.pop(item[0]) if states is not None else (None, None)
+                        stream.sync()
+                        checkpoint.save(item[0] + 1, state, data)
+                metrics.count('frames')
+                yield item
+        
+        for frame_idx, fpga_response in sobel_frames():
+            with metrics.time('upscale'):
+                sobel = self.fpga_response_to_frame(fpga_response, renderer.width, renderer.height)
+            renderer.push(sobel)
+            
+            now = time.monotonic()
+            if now - last_snapshot >= ANALYTICS_SNAPSHOT_INTERVAL:
+                with metrics.time('job_io'):
+                    write_json_atomic(analytics_file, self.partial_analytics(renderer))
+                last_snapshot = now
+                if self.worker_metrics is not None:
+                    self.worker_metrics.maybe_write()
+            
+            processed = frame_idx + 1
+            if processed % 10 == 0:
+                updates = {'processed_frames': processed}
+                if 0 < total_frames < processed:
+                    # The estimate was short; keep the progress bar consistent.
+                    total_frames = updates['total_frames'] = processed
+                    if metrics.enabled:
+                        metrics.total_frames = total_frames
+                self.update_job(session_path, **updates)
+                if total_frames > 0:
+                    print(f"  {processed}/{total_frames} frames ({processed / total_frames * 100:.1f}%)")
+                else:
+                    print(f"  {processed} frames")
+    
+    def process_session(self, session_path, live=None):
+        """Process a single session: FPGA Sobel filter + movement heatmap + analytics.
+        With `live` (a LiveCapture) the frames come from it instead of original.webm,
+        which the capture records as it goes."""
+        try:
+            ok = self._process_session(session_path, live)
+        except Exception:
+            self._finish_metrics(session_path, "error")
+            raise
+        self._finish_metrics(session_path, "done" if ok else "error")
+        return ok
+    
+    def _start_metrics(self, session_path, total_frames):
+        """Attach fresh timers to the pipeline and the boards for one session."""
+        if not self.collect_metrics:
+            return
+        # 8N1: 10 bits on the wire per byte, per board.
+        line_rate = BAUD_RATE / 10 * len(self.fpga.devices) if self.backend == 'fpga' else None
+        self.metrics = SessionMetrics(total_frames, line_rate)
+        for device in self.fpga.devices:
+            device.metrics = self.metrics
+        if self.worker_metrics is not None:
+            self.worker_metrics.start_session(session_path.name, self.metrics)
+    
+    def _finish_metrics(self, session_path, status):
+        """Write metrics.json, fold the session into the worker totals and detach the timers."""
+        metrics = self.metrics
+        if not metrics.enabled:
+            return
+        self.metrics = NULL_METRICS
+        if self.fpga is not None:
+            for device in self.fpga.devices:
+                device.metrics = NULL_METRICS
+        
+        summary = metrics.to_dict()
+        summary['status'] = status
+        try:
+            write_json_atomic(session_path / METRICS_FILE, summary)
+            print(f"Metrics: {summary['frames_per_second']} frames/s, "
+                  f"{summary['serial_bytes_per_second']} serial bytes/s -> {METRICS_FILE}")
+        except OSError as e:
+            print(f"Could not write {METRICS_FILE}: {e}")
+        if self.worker_metrics is not None:
+            self.worker_metrics.finish_session(metrics, status)
+    
+    def _process_session(self, session_path, live=None):
         session_name = session_path.name
         print(f"\n{'='*60}")
         print(f"Processing session: {session_name}")
@@ -252,8 +1143,9 @@ class JobProcessor:
         original_video = session_path / "original.webm"
         heatmap_video = session_path / "heatmap.webm"
         analytics_file = session_path / "analytics.json"
+        timeline_file = session_path / TIMELINE_FILE
         
-        if not original_video.exists():
+        if live is None and not original_video.exists():
             print(f"Error: {original_video} not found")
             self.update_job(session_path, status="error", error="Original video not found")
             return False
@@ -266,19 +1158,33 @@ class JobProcessor:
             self.update_job(session_path, status="error", error=error_msg)
             return False
         
-        width, height, fps, total_frames = self.get_video_info(original_video)
-        print(f"Video: {width}x{height} @ {fps:.1f} FPS, {total_frames} frames")
-        print(f"FPGA processing at {FPGA_WIDTH}x{FPGA_HEIGHT}, upscaling back to {width}x{height}")
+        if live is not None:
+            width, height, fps, total_frames = live.width, live.height, live.fps, 0
+        else:
+            width, height, fps, total_frames = self.get_video_info(original_video)
+        print(f"Video: {width}x{height} @ {fps:.1f} FPS, ~{total_frames} frames")
+        accum_size, output_size = self.heatmap_sizes(width, height)
+        if self.tiled_size:
+            tiles = self.make_tiler().tiles_per_frame
+            print(f"Sobel at {self.sobel_size[0]}x{self.sobel_size[1]} as {tiles} tiles of {FPGA_WIDTH}x{FPGA_HEIGHT}")
+        print(f"FPGA processing at {FPGA_WIDTH}x{FPGA_HEIGHT}, heatmap accumulated at "
+              f"{accum_size[0]}x{accum_size[1]}, written at {output_size[0]}x{output_size[1]}")
+        
+        self._start_metrics(session_path, total_frames)
         
         self.update_job(session_path, 
                         status="processing", 
                         total_frames=total_frames, 
                         processed_frames=0)
         
-        cap = cv2.VideoCapture(str(original_video))
+        cap = live if live is not None else self.open_video(original_video, fps)
         
-        fourcc = cv2.VideoWriter_fourcc(*'VP80')
-        out = cv2.VideoWriter(str(heatmap_video), fourcc, fps, (width, height))
+        if self.intermediate:
+            fourcc, intermediate_name = INTERMEDIATE_FORMATS[self.intermediate]
+            encoded_video = session_path / intermediate_name
+        else:
+            fourcc, encoded_video = HEATMAP_CODECS[self.heatmap_codec], heatmap_video
+        out = HeatmapWriter(encoded_video, fourcc, fps, output_size, self.metrics)
         
         if not out.isOpened():
             print("Error: Could not create output video writer")
@@ -286,108 +1192,179 @@ class JobProcessor:
             cap.release()
             return False
         
-        heatmap_accumulator = np.zeros((height, width), dtype=np.float32)
-        total_accumulated = np.zeros((height, width), dtype=np.float64)
-        previous_sobel = None
-        decay_rate = 0.95
-        frame_idx = 0
+        renderer = HeatmapRenderer(accum_size[0], accum_size[1], fps, out, self.compute_hot_zones,
+                                   decay_rate=self.decay_rate,
+                                   output_size=output_size, source_size=(width, height),
+                                   metrics=self.metrics,
+                                   preview_path=session_path / LIVE_PREVIEW_FILE if live is not None else None)
+        
+        # Live sessions have no motion gate and cannot be resumed: the camera frames are gone.
+        gate = self.make_gate() if live is None else None
+        tiler = self.make_tiler()
+        # The checkpoint resumes from sobel.bin, which is then written even with
+        # --no-sobel-stream and removed with the checkpoint.
+        sobel_frame_size = self.sobel_size[0] * self.sobel_size[1]
+        checkpoint = (SessionCheckpoint(session_path, original_video, sobel_frame_size,
+                                        settings=self.checkpoint_settings(),
+                                        stateful=gate is not None or tiler is not None,
+                                        keep_stream=self.sobel_stream)
+                      if self.checkpoint and live is None else None)
+        resume_from = checkpoint.open() if checkpoint is not None else 0
+        if resume_from:
+            print(f"Resuming from checkpoint: {resume_from} frames already processed")
+            self.update_job(session_path, resumed_from=resume_from)
+            if gate is not None:
+                gate.restore(checkpoint.resume_state['gate'], checkpoint.resume_data)
+            if tiler is not None:
+                tiler.restore(checkpoint.resume_state['tiler'], checkpoint.resume_data, checkpoint.last_frame())
+        # Gate/tiler state per checkpoint sync frame, from the decode to the render stage.
+        states = {} if checkpoint is not None and checkpoint.stateful else None
+        stream = (SobelStreamWriter(session_path / SOBEL_STREAM_FILE, fps, self.sobel_size, resume_from)
+                  if self.sobel_stream or checkpoint is not None else None)
         
-        intensity_timeline = []
-        zone_timeline = []
-        peak_intensity = 0
-        peak_frame = 0
+        stop = threading.Event()
+        render_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
         
-        sample_interval = max(1, int(fps / 10))
+        # Live frames arrive irregularly, so their capture times are always kept.
+        timestamps = [] if self.frame_index or live is not None else None
+        stages = []
+        if live is not None:
+            convert = tiler.split if tiler is not None else self.frame_to_fpga_format
+            tx_queue = LiveFrameSource(live, convert, timestamps, self.metrics)
+        else:
+            tx_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE + len(self.fpga.devices))
+            stages.append(StageThread("decode", stop, self._decode_stage,
+                                      cap, tx_queue, stop, timestamps, resume_from, gate, tiler, states))
+        render = StageThread("render", stop, self._render_stage,
+                             renderer, render_queue, stop, session_path, total_frames, checkpoint, stream,
+                             tiler, states)
+        stages.append(render)
         
         print("Processing frames via FPGA...")
         self.fpga.clear_buffer()
+        cache_start = self.cache.stats() if self.cache is not None else None
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            fpga_input = self.frame_to_fpga_format(frame)
-            self.fpga.send_frame(fpga_input)
-            
-            fpga_response = self.fpga.receive_frame(timeout=FPGA_TIMEOUT)
-            
-            if fpga_response is None:
-                error_msg = f"FPGA timeout at frame {frame_idx}"
-                print(f"\nError: {error_msg}")
-                self.update_job(session_path, status="error", error=error_msg)
-                cap.release()
-                out.release()
-                if heatmap_video.exists():
-                    heatmap_video.unlink()
-                return False
-            
-            sobel = self.fpga_response_to_frame(fpga_response, width, height)
-            
-            if previous_sobel is not None:
-                delta = cv2.absdiff(sobel, previous_sobel).astype(np.float32)
-                heatmap_accumulator = (heatmap_accumulator * decay_rate) + delta
-                total_accumulated += delta
-            
-            previous_sobel = sobel
-            
-            frame_intensity = float(np.mean(heatmap_accumulator))
-            
-            if frame_idx % sample_interval == 0:
-                intensity_timeline.append({
-                    'frame': frame_idx,
-                    'time': round(frame_idx / fps, 2),
-                    'intensity': round(frame_intensity, 2)
-                })
-                zone_snapshot = self.compute_hot_zones(heatmap_accumulator, height, width)
-                zone_timeline.append({
-                    'time': round(frame_idx / fps, 2),
-                    'zones': zone_snapshot
-                })
-            
-            if frame_intensity > peak_intensity:
-                peak_intensity = frame_intensity
-                peak_frame = frame_idx
-            
-            norm_heatmap = cv2.normalize(heatmap_accumulator, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
-            visual_heatmap = cv2.applyColorMap(norm_heatmap, cv2.COLORMAP_INFERNO)
-            
-            out.write(visual_heatmap)
-            
-            frame_idx += 1
-            
-            if frame_idx % 10 == 0:
-                self.update_job(session_path, processed_frames=frame_idx)
-                progress = (frame_idx / total_frames) * 100 if total_frames > 0 else 0
-                print(f"  {frame_idx}/{total_frames} frames ({progress:.1f}%)")
+        for stage in stages:
+            stage.start()
+        try:
+            error_msg = self._sobel_stage(tx_queue, render_queue, stop, resume_from)
+        except Exception:
+            stop.set()
+            raise
+        finally:
+            _put(render_queue, _END, stop)
+            for stage in stages:
+                stage.join()
+            cap.release()
+            out.release()
         
-        cap.release()
-        out.release()
+        for stage in stages + [out]:
+            if error_msg is None and stage.error is not None:
+                name = stage.name if stage is not out else "encode"
+                error_msg = f"{name} stage failed: {stage.error}"
+        
+        if self.cache is not None:
+            stats = self.cache.stats()
+            cache_hits = stats['hits'] - cache_start['hits']
+            cache_misses = stats['misses'] - cache_start['misses']
+            print(f"Frame cache: {cache_hits} hits, {cache_misses} misses")
+            self.update_job(session_path, cache_hits=cache_hits, cache_misses=cache_misses)
+            self.cache.save()
+        
+        if error_msg is not None:
+            print(f"\nError: {error_msg}")
+            self.update_job(session_path, status="error", error=error_msg)
+            if checkpoint is not None and not checkpoint.stateful:
+                # Nothing runs ahead of the frames, so all of them can be resumed.
+                stream.sync()
+                checkpoint.save(stream.frames)
+            if checkpoint is not None and checkpoint.saved_frames:
+                # heatmap.webm is rebuilt from the checkpoint when the job is retried.
+                print(f"Checkpoint kept at frame {checkpoint.saved_frames}; set the job back to pending to resume")
+                self.update_job(session_path, checkpoint_frames=checkpoint.saved_frames)
+                stream.release()
+            elif stream is not None:
+                stream.discard()
+            renderer.close()
+            for path in (encoded_video, heatmap_video, analytics_file, timeline_file):
+                if path.exists():
+                    path.unlink()
+            return False
+        
+        frame_idx = renderer.frame_count
+        if timestamps is not None:
+            self.save_frame_index(session_path, timestamps)
+        if stream is not None:
+            stream.close(timestamps, source=source_stamp(original_video) if original_video.exists() else None,
+                         **self.stream_meta(gate, tiler))
+        if checkpoint is not None:
+            # Until heatmap.webm is done, a retry replays every frame.
+            state, data = _decode_state(gate, tiler) if checkpoint.stateful else (None, None)
+            checkpoint.save(stream.frames, state, data)
         
         print("Computing analytics...")
+        analytics = self.final_analytics(renderer)
+        if original_video.exists():
+            analytics['analysis'] = dict(self.analysis_params(), source=source_stamp(original_video))
+        if live is not None:
+            analytics['live'] = live.stats()
+            print(f"Live: {analytics['live']['frames_processed']} frames processed, "
+                  f"{analytics['live']['frames_dropped']} dropped to stay current")
+        if gate is not None:
+            analytics['motion_gate'] = gate.stats()
+            print(f"Motion gate: {gate.skipped} of {gate.sent + gate.skipped} frames skipped")
+        if tiler is not None:
+            analytics['tiling'] = tiler.stats()
+            print(f"Tiling: {tiler.tiles_skipped} of {tiler.tiles_sent + tiler.tiles_skipped} tiles unchanged")
+        
+        self.write_analytics(session_path, renderer, analytics)
+        renderer.close()
+        print(f"Analytics saved to {analytics_file}")
         
-        intensity_values = [p['intensity'] for p in intensity_timeline]
+        if encoded_video != heatmap_video:
+            self.update_job(session_path, processed_frames=frame_idx, transcoding=True)
+            if self.transcoder is not None:
+                print(f"Heatmap queued for transcoding to {self.heatmap_codec}")
+                self.transcoder.submit(self._transcode_heatmap, session_path, encoded_video,
+                                       heatmap_video, fps, frame_idx, checkpoint)
+                return True
+            return self._transcode_heatmap(session_path, encoded_video, heatmap_video,
+                                           fps, frame_idx, checkpoint)
+        return self._finish_heatmap(session_path, heatmap_video, frame_idx, checkpoint)
+    
+    def final_analytics(self, renderer):
+        """analytics.json of a finished session, from its renderer.
         
-        dominant_freq, freq_strength = self.compute_periodicity(intensity_values, fps / sample_interval)
-        rhythm_regularity, cycle_count = self.compute_rhythm_regularity(intensity_values)
-        hot_zones = self.compute_hot_zones(total_accumulated, height, width)
+        The periodicity is an FFT of the spooled intensity timeline (one float64
+        copy of that column, not the whole timeline); the rhythm is a second
+        pass over it, a chunk at a time, once the session's 75th percentile
+        is known.
+        """
+        fps = renderer.fps
+        frame_idx = renderer.frame_count
+        total_accumulated = renderer.total_accumulated
+        engine = renderer.analytics
         
-        avg_intensity = float(np.mean(intensity_values)) if intensity_values else 0
+        dominant_freq, freq_strength = session_periodicity(renderer.timeline.samples()['intensity'],
+                                                           fps / renderer.sample_interval)
+        threshold = engine.percentile(75)
+        rhythm_regularity, cycle_count = session_rhythm(renderer.timeline.chunks('intensity'), threshold)
+        hot_zones = self.compute_hot_zones(total_accumulated, renderer.height, renderer.width)
         
-        threshold = np.percentile(intensity_values, 75) if intensity_values else 0
+        avg_intensity = engine.average()
         active_area = float(np.mean(total_accumulated > threshold)) * 100 if total_accumulated.size > 0 else 0
         
-        analytics = {
+        return {
             'duration_seconds': round(frame_idx / fps, 2),
             'total_frames': frame_idx,
             'fps': round(fps, 2),
-            'resolution': {'width': width, 'height': height},
+            'resolution': {'width': renderer.source_size[0], 'height': renderer.source_size[1]},
             'fpga_resolution': {'width': FPGA_WIDTH, 'height': FPGA_HEIGHT},
             'intensity': {
                 'average': round(avg_intensity, 2),
-                'peak': round(peak_intensity, 2),
-                'peak_time': round(peak_frame / fps, 2),
-                'peak_frame': peak_frame
+                'peak': round(renderer.peak_intensity, 2),
+                'peak_time': round(renderer.peak_frame / fps, 2),
+                'peak_frame': renderer.peak_frame
             },
             'repetition': {
                 'dominant_frequency_hz': round(dominant_freq, 3) if dominant_freq else None,
@@ -397,94 +1374,410 @@ class JobProcessor:
             },
             'hot_zones': hot_zones,
             'active_area_percent': round(active_area, 1),
-            'timeline': intensity_timeline,
-            'zone_timeline': zone_timeline
+            'timeline_file': TIMELINE_FILE,
+            'timeline_samples': engine.sample_count
         }
-        
-        with open(analytics_file, 'w') as f:
-            json.dump(analytics, f, indent=2)
-        
-        print(f"Analytics saved to {analytics_file}")
-        
+    
+    def write_analytics(self, session_path, renderer, analytics):
+        """Write timeline.bin and analytics.json for a finished session."""
+        # The dense series go to the columnar file, written before analytics.json
+        # so a final analytics.json always has its timeline next to it.
+        fps = renderer.fps
+        write_timeline(session_path / TIMELINE_FILE, renderer.timeline.samples(), fps, fps / renderer.sample_interval)
+        write_json_atomic(session_path / "analytics.json", analytics)
+    
+    def _transcode_heatmap(self, session_path, encoded_video, heatmap_video, fps, frame_idx, checkpoint):
+        """Re-encode the intermediate heatmap as heatmap.webm and finish the session."""
+        print(f"Transcoding {session_path.name} heatmap to {self.heatmap_codec}...")
+        start = time.monotonic()
+        try:
+            transcode_video(encoded_video, heatmap_video, HEATMAP_CODECS[self.heatmap_codec], fps)
+            encoded_video.unlink()
+        except Exception as e:
+            print(f"Error transcoding {session_path.name}: {e}")
+            if heatmap_video.exists():
+                heatmap_video.unlink()
+            # The checkpoint is still there, so a retry only replays and re-encodes.
+            update_job_file(session_path, status="error", error=f"Transcode failed: {e}")
+            return False
+        print(f"Transcoded {session_path.name} in {time.monotonic() - start:.1f}s")
+        return self._finish_heatmap(session_path, heatmap_video, frame_idx, checkpoint, transcoding=False)
+    
+    def _finish_heatmap(self, session_path, heatmap_video, frame_idx, checkpoint, **updates):
+        """Mark the session done once heatmap.webm is in place."""
         if heatmap_video.exists() and heatmap_video.stat().st_size > 0:
-            self.update_job(session_path, 
-                            status="done", 
-                            processed_frames=frame_idx)
+            if checkpoint is not None:
+                checkpoint.discard()
+            update_job_file(session_path,
+                            status="done",
+                            total_frames=frame_idx,
+                            processed_frames=frame_idx,
+                            **updates)
             print(f"Complete! Processed {frame_idx} frames")
             print(f"Output: {heatmap_video}")
             return True
         else:
-            self.update_job(session_path, status="error", error="Output video empty")
+            update_job_file(session_path, status="error", error="Output video empty")
             return False
 
 
-def find_pending_jobs(sessions_dir):
-    """Find all sessions with pending status."""
-    pending = []
-    
-    if not sessions_dir.exists():
-        return pending
+def make_processor(args, ports=None, metrics_file=None, defer_transcode=False):
+    """Build a JobProcessor (and its frame cache) from the command line options."""
+    cache = FrameCache(args.cache_size, args.cache_file) if args.cache_size > 0 else None
+    return JobProcessor(backend=args.backend, cache=cache, heatmap_mode=args.heatmap_mode,
+                        frame_index=args.frame_index, ports=ports or args.port,
+                        checkpoint=not args.no_checkpoint, metrics=args.metrics,
+                        metrics_file=metrics_file or args.metrics_file,
+                        heatmap_size=args.heatmap_size, heatmap_codec=args.heatmap_codec,
+                        intermediate=args.heatmap_intermediate, defer_transcode=defer_transcode,
+                        motion_threshold=args.motion_threshold, refresh_interval=args.refresh_interval,
+                        sobel_stream=not args.no_sobel_stream, decoder=args.decoder,
+                        tiled_size=args.tiled_size, tile_threshold=args.tile_threshold)
+
+
+def run_session(processor, session_path, live=None):
+    """Process one session, recording any unexpected failure in its job.json."""
+    try:
+        processor.process_session(session_path, live)
+    except Exception as e:
+        print(f"Error processing {session_path.name}: {e}")
+        traceback.print_exc()
+        try:
+            processor.update_job(session_path, status="error", error=str(e))
+        except OSError as job_error:
+            # The session folder was moved or deleted while it was processed.
+            print(f"Could not record the error for {session_path.name}: {job_error}")
+
+
+# Per-process JobProcessor of the session pool (see serve_parallel).
+_pool_processor = None
+
+
+def _init_pool_worker(args, port_groups):
+    """Pool process initializer. FPGA workers take exclusive ownership of one group of ports."""
+    global _pool_processor
+    ports = port_groups.get() if port_groups is not None else None
+    metrics_file = None
+    if args.metrics_file:
+        # One file per process; a textfile collector picks up all of them.
+        path = Path(args.metrics_file)
+        metrics_file = path.with_name(f"{path.stem}-{os.getpid()}{path.suffix}")
+    _pool_processor = make_processor(args, ports, metrics_file)
+
+
+def _run_pool_session(session_path):
+    run_session(_pool_processor, session_path)
+
+
+def _read_job(session_path):
+    try:
+        with open(session_path / "job.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _recover_crashed(session_path, crashes):
+    """A pool process died while the session was queued or running on it. A
+    session it had started goes back to pending (it resumes from its checkpoint),
+    unless it was already caught in MAX_POOL_CRASHES deaths: then it fails."""
+    if _read_job(session_path).get('status') != "processing":
+        return
+    crashes[session_path] = crashes.get(session_path, 0) + 1
+    if crashes[session_path] >= MAX_POOL_CRASHES:
+        print(f"Giving up on {session_path.name}: its worker process died {crashes[session_path]} times")
+        update_job_file(session_path, status="error",
+                        error=f"Worker process died {crashes[session_path]} times while processing the session")
+    else:
+        print(f"Requeueing {session_path.name}: its worker process died")
+        update_job_file(session_path, status="pending")
+
+
+def _process_alive(pid):
+    if not pid or os.name != 'posix':
+        # os.kill() would terminate the process on Windows.
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def requeue_interrupted(watcher):
+    """Put sessions a previous worker left half-done back in the queue; they
+    resume from their checkpoint. Assumes a single worker per sessions folder.
     
-    for session_path in sessions_dir.iterdir():
-        if not session_path.is_dir():
+    A live session cannot be resumed (the camera has moved on), so one whose
+    `worker.py --live` process is gone is marked as failed instead."""
+    for session_path, status in sorted(watcher.states.items()):
+        if status != "processing":
             continue
+        job = _read_job(session_path)
+        if not job.get('live'):
+            print(f"Requeueing interrupted session {session_path.name}")
+            update_job_file(session_path, status="pending")
+        elif not _process_alive(job.get('worker_pid')):
+            print(f"Live session {session_path.name} was interrupted")
+            update_job_file(session_path, status="error",
+                            error="Live session interrupted: its worker stopped before finalizing it")
+
+
+def serve_sequential(args):
+    # Transcodes overlap the next session's link work; pool processes run them inline.
+    processor = make_processor(args, defer_transcode=True)
+    watcher = SessionWatcher(args.sessions_dir, POLL_INTERVAL)
+    requeue_interrupted(watcher)
+    try:
+        while True:
+            pending = watcher.pending()
+            
+            if pending:
+                print(f"\nFound {len(pending)} pending job(s)")
+                for session_path in pending:
+                    run_session(processor, session_path)
+            elif args.once:
+                return
+            else:
+                print(".", end="", flush=True)
+                watcher.wait(POLL_INTERVAL)
+    finally:
+        watcher.close()
+        processor.close()
+
+
+def serve_parallel(args, jobs, port_groups=None):
+    """Fan pending sessions out to `jobs` worker processes.
+    
+    With the FPGA backend each process is handed its own group of serial
+    ports, so a board is only ever opened by one process.
+    """
+    def start_pool():
+        # Every process of a new pool takes a port group, so the queue is refilled.
+        group_queue = None
+        if port_groups is not None:
+            group_queue = multiprocessing.Queue()
+            for group in port_groups:
+                group_queue.put(group)
+        return ProcessPoolExecutor(max_workers=jobs, initializer=_init_pool_worker,
+                                   initargs=(args, group_queue))
+    
+    in_flight = {}
+    crashes = {}
+    watcher = SessionWatcher(args.sessions_dir, POLL_INTERVAL)
+    requeue_interrupted(watcher)
+    executor = start_pool()
+    try:
+        while True:
+            broken = False
+            for session_path, future in list(in_flight.items()):
+                if future.done():
+                    del in_flight[session_path]
+                    if isinstance(future.exception(), BrokenProcessPool):
+                        broken = True
+                        _recover_crashed(session_path, crashes)
+                    elif future.exception() is not None:
+                        print(f"Error processing {session_path.name}: {future.exception()}")
+            if broken:
+                # A dead process takes the whole pool down; the other sessions
+                # in flight fail with it and are recovered as they are reaped.
+                print("\nA worker process died; restarting the pool")
+                executor.shutdown(cancel_futures=True)
+                for session_path, future in list(in_flight.items()):
+                    future.cancel()
+                    del in_flight[session_path]
+                    _recover_crashed(session_path, crashes)
+                executor = start_pool()
+            
+            pending = [p for p in watcher.pending() if p not in in_flight]
+            if pending:
+                print(f"\nFound {len(pending)} pending job(s), {len(in_flight)} running")
+                for session_path in pending:
+                    future = executor.submit(_run_pool_session, session_path)
+                    future.add_done_callback(lambda _: watcher.wake())
+                    in_flight[session_path] = future
+            elif not in_flight:
+                if args.once:
+                    return
+                print(".", end="", flush=True)
+            
+            watcher.wait(POLL_INTERVAL)
+    finally:
+        executor.shutdown(cancel_futures=True)
+        watcher.close()
+
+
+def default_live_fps(processor):
+    """Frames/s the Sobel backend can keep up with: one 19,200-byte frame (per
+    tile, when tiled) each way per board over 8N1 serial, or a fixed rate for
+    the emulator."""
+    if processor.backend == 'emulator':
+        return LIVE_EMULATOR_FPS
+    frame_bytes = FRAME_SIZE
+    tiler = processor.make_tiler()
+    if tiler is not None:
+        frame_bytes *= tiler.tiles_per_frame
+    return len(processor.fpga.devices) * BAUD_RATE / 10 / (2 * frame_bytes)
+
+
+def run_live(args):
+    """Process a camera in real time as a new session until Ctrl+C (or --live-duration)."""
+    processor = make_processor(args)
+    try:
+        processor.connect_fpga()
+        fps = args.live_fps or default_live_fps(processor)
         
-        job_path = session_path / "job.json"
-        if not job_path.exists():
-            continue
+        started = datetime.now(timezone.utc)
+        session_path = args.sessions_dir / f"{started.strftime('%Y-%m-%dT%H-%M-%S')}-live"
+        session_path.mkdir(parents=True)
+        write_json_atomic(session_path / "job.json", {
+            'status': 'processing',
+            'live': True,
+            'worker_pid': os.getpid(),
+            'total_frames': 0,
+            'processed_frames': 0,
+            'created_at': started.isoformat(),
+        })
         
         try:
-            with open(job_path, 'r') as f:
-                job = json.load(f)
-            
-            if job.get("status") == "pending":
-                pending.append(session_path)
-        except:
-            continue
-    
-    return pending
+            live = LiveCapture(args.live, fps, record_path=session_path / "original.webm")
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            update_job_file(session_path, status="error", error=str(e))
+            return
+        print(f"Live session {session_path.name}: {args.live} at {fps:.2f} frames/s")
+        print("Press Ctrl+C to stop and finalize the session")
+        
+        # Stopping the capture ends the stream; the pipeline then drains and
+        # writes heatmap.webm and analytics.json like for a recorded session.
+        previous_handler = signal.signal(signal.SIGINT, lambda *_: live.stop())
+        timer = None
+        if args.live_duration:
+            timer = threading.Timer(args.live_duration, live.stop)
+            timer.start()
+        try:
+            run_session(processor, session_path, live)
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+            if timer is not None:
+                timer.cancel()
+            live.release()
+            preview = session_path / LIVE_PREVIEW_FILE
+            if preview.exists():
+                preview.unlink()
+    finally:
+        processor.close()
+
+
+def parse_size(text):
+    """argparse type for WIDTHxHEIGHT."""
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}")
+    return width, height
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Movement Analyzer Worker")
+    parser.add_argument("--backend", choices=SOBEL_BACKENDS, default='fpga',
+                        help="'emulator' runs the bit-exact NumPy model of the board.")
+    parser.add_argument("--decoder", choices=DECODERS, default='opencv',
+                        help="'ffmpeg' decodes recordings in an ffmpeg process straight to 160x120 gray "
+                             "(multithreaded, no full-size BGR frames); falls back to OpenCV without ffmpeg.")
+    parser.add_argument("--cache-size", type=int, default=CACHE_MAX_ENTRIES,
+                        help="Sobel results kept for identical input frames (0 disables).")
+    parser.add_argument("--cache-file",
+                        help="Persist the frame cache to this file across sessions.")
+    parser.add_argument("--frame-index", action="store_true",
+                        help=f"Save per-frame timestamps as {FRAME_INDEX_FILE} in each session.")
+    parser.add_argument("--no-checkpoint", action="store_true",
+                        help="Do not log received frames for resuming interrupted sessions.")
+    parser.add_argument("--no-sobel-stream", action="store_true",
+                        help=f"Do not keep the received Sobel frames as {SOBEL_STREAM_FILE} in each session.")
+    parser.add_argument("--metrics", action="store_true",
+                        help=f"Time every pipeline stage and write {METRICS_FILE} in each session.")
+    parser.add_argument("--metrics-file",
+                        help="Keep worker-wide metrics in this Prometheus text file (implies --metrics).")
+    parser.add_argument("--heatmap-mode", choices=HEATMAP_MODES, default='full',
+                        help="'native' accumulates the heatmap at the FPGA's 160x120 and only "
+                             "upscales the colormapped frame; 'native-output' also writes it at 160x120.")
+    parser.add_argument("--heatmap-size", type=parse_size, metavar="WxH",
+                        help="Resolution heatmap.webm is written at (default: set by --heatmap-mode).")
+    parser.add_argument("--heatmap-codec", choices=sorted(HEATMAP_CODECS), default='vp8')
+    parser.add_argument("--heatmap-intermediate", choices=sorted(INTERMEDIATE_FORMATS),
+                        help="Write the heatmap in this cheap format during the session and "
+                             "transcode it to heatmap.webm afterwards, while the board starts the next one.")
+    parser.add_argument("--tiled-size", type=parse_size, metavar="WxH",
+                        help="Run the Sobel at this resolution instead of 160x120, sending each frame "
+                             "to the board as overlapping 160x120 tiles and stitching the results.")
+    parser.add_argument("--tile-threshold", type=float, default=0.0,
+                        help="With --tiled-size, a tile is resent only if its input differs from what was "
+                             "last sent by at least this mean grey level (0: any change).")
+    parser.add_argument("--motion-threshold", type=float, default=0.0,
+                        help="Skip frames whose 160x120 input differs from the last frame sent by less "
+                             "than this mean grey level, reusing its Sobel result (0 disables).")
+    parser.add_argument("--refresh-interval", type=int, default=DEFAULT_REFRESH_INTERVAL,
+                        help="With --motion-threshold, send at least one frame in every N.")
+    parser.add_argument("--live", metavar="SOURCE",
+                        help="Process a camera (index or device such as /dev/video2) in real time "
+                             "as a new session instead of watching the sessions folder.")
+    parser.add_argument("--live-fps", type=float,
+                        help="Frames/s taken from the camera in live mode; newer frames replace "
+                             "older ones the board has not taken yet (default: what the backend sustains).")
+    parser.add_argument("--live-duration", type=float,
+                        help="Stop live mode after this many seconds (default: until Ctrl+C).")
+    parser.add_argument("--port", action="append",
+                        help="Serial port of a board (repeatable); default: auto-discover.")
+    parser.add_argument("--sessions-dir", type=Path, default=SESSIONS_DIR)
+    parser.add_argument("--once", action="store_true",
+                        help="Exit once no session is pending instead of watching for new ones.")
+    parser.add_argument("--jobs", type=int,
+                        help="Sessions processed in parallel, one process each (default: all cores "
+                             "with the emulator, 1 with the FPGA; FPGA jobs split the boards between them).")
+    args = parser.parse_args()
+    
+    if args.live is not None:
+        run_live(args)
+        return
+    
     print("=" * 60)
-    print("  Movement Analyzer Worker (FPGA)")
+    print(f"  Movement Analyzer Worker ({args.backend.upper()})")
     print("=" * 60)
-    print(f"Watching: {SESSIONS_DIR}")
+    print(f"Watching: {args.sessions_dir}")
     
-    available_ports = [p.device for p in serial.tools.list_ports.comports()]
-    if available_ports:
-        print(f"Available ports: {', '.join(available_ports)}")
+    port_groups = None
+    if args.backend == 'fpga':
+        available_ports = [p.device for p in serial.tools.list_ports.comports()]
+        if available_ports:
+            print(f"Available ports: {', '.join(available_ports)}")
+        else:
+            print("Warning: No serial ports detected")
+        
+        jobs = args.jobs or 1
+        if jobs > 1:
+            ports = args.port or discover_serial_ports()
+            jobs = max(1, min(jobs, len(ports)))
+            port_groups = [ports[i::jobs] for i in range(jobs)]
     else:
-        print("Warning: No serial ports detected")
+        jobs = args.jobs or os.cpu_count() or 1
     
+    if jobs > 1:
+        print(f"Processing up to {jobs} sessions in parallel")
     print(f"Press Ctrl+C to stop")
     print("=" * 60)
     
-    processor = JobProcessor()
-    
     try:
-        while True:
-            pending = find_pending_jobs(SESSIONS_DIR)
-            
-            if pending:
-                print(f"\nFound {len(pending)} pending job(s)")
-                for session_path in pending:
-                    try:
-                        processor.process_session(session_path)
-                    except Exception as e:
-                        print(f"Error processing {session_path.name}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        processor.update_job(session_path, status="error", error=str(e))
-            else:
-                print(".", end="", flush=True)
-            
-            time.sleep(POLL_INTERVAL)
-    
+        if jobs > 1:
+            serve_parallel(args, jobs, port_groups)
+        else:
+            serve_sequential(args)
     except KeyboardInterrupt:
         print("\n\nWorker stopped.")
-    finally:
-        processor.disconnect_fpga()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+"""
+Worker Metrics
+Per-stage timers and counters for the worker hot path (decode, conversion,
+serial TX / board wait / RX, upscale, heatmap math, colormap, VP8 encode and
+job file I/O). Each session's numbers go to metrics.json next to its outputs;
+the worker also keeps a rolling Prometheus text-format file with the totals
+of every session it has run plus the one in progress.
+
+When metrics are off the stages are handed NULL_METRICS, whose timer is a
+shared no-op context manager, so the instrumentation costs a method call.
+"""
+
+import time
+import bisect
+import threading
+
+from fpga_link import atomic_write
+
+METRICS_FILE = "metrics.json"
+
+# Histogram bucket upper bounds, seconds (Prometheus "le" labels).
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Minimum seconds between rewrites of the Prometheus file during a session.
+PROMETHEUS_WRITE_INTERVAL = 2.0
+
+PROMETHEUS_PREFIX = "sobel_worker"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def copy(self):
+        histogram = Histogram()
+        histogram.merge(self)
+        return histogram
+
+    def to_dict(self):
+        labels = [f"{b * 1000:g}" for b in BUCKETS] + ['+Inf']
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 4),
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else None,
+            'max_ms': round(self.max * 1000, 3),
+            # Observations per bucket, keyed by the bucket's upper bound in ms.
+            'buckets_ms': dict(zip(labels, self.counts)),
+        }
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Stand-in used when metrics are disabled; every call is a no-op."""
+
+    enabled = False
+
+    def time(self, stage):
+        return _NULL_TIMER
+
+    def observe(self, stage, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class SessionMetrics:
+    """Timers and counters of one session. Stages run on several threads."""
+
+    enabled = True
+
+    def __init__(self, total_frames=0, line_bytes_per_second=None):
+        self.started = time.monotonic()
+        self.total_frames = total_frames
+        self.line_bytes_per_second = line_bytes_per_second
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def time(self, stage):
+        """Context manager adding the time spent in the block to `stage`."""
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """Copies of the histograms and counters, consistent with each other."""
+        with self.lock:
+            return ({stage: h.copy() for stage, h in self.histograms.items()},
+                    dict(self.counters))
+
+    def rates(self, counters):
+        """Derived gauges: frames/s (frames from the board or cache), effective
+        serial bytes/s and ETA."""
+        elapsed = time.monotonic() - self.started
+        frames = counters.get('frames', 0)
+        serial_bytes = counters.get('serial_tx_bytes', 0) + counters.get('serial_rx_bytes', 0)
+        fps = frames / elapsed if elapsed > 0 else 0.0
+        # Frames replayed from a checkpoint are done but say nothing about the rate.
+        remaining = max(0, self.total_frames - frames - counters.get('replayed_frames', 0))
+
+        rates = {
+            'elapsed_seconds': round(elapsed, 3),
+            'frames_per_second': round(fps, 3),
+            'serial_bytes_per_second': round(serial_bytes / elapsed, 1) if elapsed > 0 else 0.0,
+            'eta_seconds': round(remaining / fps, 1) if fps > 0 and self.total_frames else None,
+        }
+        if self.line_bytes_per_second:
+            rates['serial_line_utilization'] = round(
+                rates['serial_bytes_per_second'] / self.line_bytes_per_second, 3)
+        return rates
+
+    def to_dict(self):
+        histograms, counters = self.snapshot()
+        summary = self.rates(counters)
+        summary['total_frames'] = self.total_frames
+        summary['counters'] = counters
+        summary['stages'] = {stage: h.to_dict() for stage, h in sorted(histograms.items())}
+        return summary
+
+
+class WorkerMetrics:
+    """Worker-wide totals across sessions, exported in Prometheus text format.
+
+    The file is rewritten (atomically) when a session starts or ends and at
+    most every PROMETHEUS_WRITE_INTERVAL seconds in between, so it always
+    reflects the session in progress.
+    """
+
+    def __init__(self, path, write_interval=PROMETHEUS_WRITE_INTERVAL):
+        self.path = path
+        self.write_interval = write_interval
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.sessions = {}
+        self.current = None
+        self.current_name = None
+        self.last_write = 0.0
+
+    def start_session(self, name, metrics):
+        self.current = metrics
+        self.current_name = name
+        self.write()
+
+    def finish_session(self, metrics, status):
+        histograms, counters = metrics.snapshot()
+        for stage, histogram in histograms.items():
+            self.histograms.setdefault(stage, Histogram()).merge(histogram)
+        for name, n in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+        self.sessions[status] = self.sessions.get(status, 0) + 1
+        self.current = None
+        self.current_name = None
+        self.write()
+
+    def maybe_write(self):
+        if time.monotonic() - self.last_write >= self.write_interval:
+            self.write()
+
+    def write(self):
+        self.last_write = time.monotonic()
+        with atomic_write(self.path, 'w') as f:
+            f.write(self.render())
+
+    def render(self):
+        histograms = {stage: h.copy() for stage, h in self.histograms.items()}
+        counters = dict(self.counters)
+        rates = None
+        if self.current is not None:
+            live_histograms, live_counters = self.current.snapshot()
+            for stage, histogram in live_histograms.items():
+                histograms.setdefault(stage, Histogram()).merge(histogram)
+            for name, n in live_counters.items():
+                counters[name] = counters.get(name, 0) + n
+            rates = self.current.rates(live_counters)
+
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {p}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, histogram.counts):
+                cumulative += n
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines.append(f"# HELP {p}_events_total Frames, bytes and other events counted by the worker.")
+        lines.append(f"# TYPE {p}_events_total counter")
+        for name, n in sorted(counters.items()):
+            lines.append(f'{p}_events_total{{event="{name}"}} {n}')
+
+        lines.append(f"# HELP {p}_sessions_total Finished sessions by final status.")
+        lines.append(f"# TYPE {p}_sessions_total counter")
+        for status, n in sorted(self.sessions.items()):
+            lines.append(f'{p}_sessions_total{{status="{status}"}} {n}')
+
+        lines.append(f"# TYPE {p}_start_time_seconds gauge")
+        lines.append(f"{p}_start_time_seconds {self.started:.3f}")
+
+        lines.append(f"# HELP {p}_session_active 1 while a session is being processed.")
+        lines.append(f"# TYPE {p}_session_active gauge")
+        if rates is None:
+            lines.append(f"{p}_session_active 0")
+        else:
+            session = f'session="{self.current_name}"'
+            lines.append(f"{p}_session_active{{{session}}} 1")
+            gauges = (
+                ('session_frames_per_second', rates['frames_per_second']),
+                ('session_serial_bytes_per_second', rates['serial_bytes_per_second']),
+                ('session_eta_seconds', rates['eta_seconds']),
+            )
+            for name, value in gauges:
+                if value is not None:
+                    lines.append(f"# TYPE {p}_{name} gauge")
+                    lines.append(f"{p}_{name}{{{session}}} {value}")
+        return "\n".join(lines) + "\n"
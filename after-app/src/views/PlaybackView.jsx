@@ -1,5 +1,10 @@
 import React, { useRef, useState, useEffect } from 'react';
 
+const ZONE_NAMES = ['tl', 'tc', 'tr', 'ml', 'mc', 'mr', 'bl', 'bc', 'br'];
+
+// Points the intensity graph is drawn with; longer sessions use a min/max level.
+const GRAPH_MAX_POINTS = 600;
+
 function PlaybackView({ sessionName, onBack }) {
   const originalRef = useRef(null);
   const heatmapRef = useRef(null);
@@ -9,6 +14,8 @@ function PlaybackView({ sessionName, onBack }) {
   const [duration, setDuration] = useState(0);
   const [hasHeatmap, setHasHeatmap] = useState(false);
   const [analytics, setAnalytics] = useState(null);
+  const [timeline, setTimeline] = useState(null);
+  const [zoneTimeline, setZoneTimeline] = useState(null);
 
   useEffect(() => {
     if (!sessionName) return;
@@ -25,6 +32,43 @@ function PlaybackView({ sessionName, onBack }) {
 
     const analyticsData = window.api.readAnalytics(sessionName);
     setAnalytics(analyticsData);
+    setTimeline(null);
+    setZoneTimeline(null);
+
+    if (analyticsData?.timeline_file) {
+      const header = window.api.readTimeline(sessionName, { columns: [] })?.header;
+      if (!header) return;
+      // The coarsest level is tiny: draw it right away, then load the detail.
+      const coarsest = header.levels.length;
+      setTimeline(toGraphSeries(window.api.readTimeline(sessionName, { level: coarsest })));
+      const timer = setTimeout(() => {
+        const level = graphLevel(header);
+        if (level !== coarsest) {
+          setTimeline(toGraphSeries(window.api.readTimeline(sessionName, { level })));
+        }
+        const zones = window.api.readTimeline(sessionName, {
+          columns: ['time', ...ZONE_NAMES.map(name => `zone_${name}`)]
+        });
+        if (zones) {
+          setZoneTimeline({
+            time: zones.columns.time,
+            zones: Object.fromEntries(ZONE_NAMES.map(name => [name, zones.columns[`zone_${name}`]]))
+          });
+        }
+      }, 0);
+      return () => clearTimeout(timer);
+    }
+
+    if (analyticsData?.timeline) {
+      // analytics.json written before timeline.bin existed.
+      const values = analyticsData.timeline.map(p => p.intensity);
+      setTimeline({ time: analyticsData.timeline.map(p => p.time), min: values, max: values });
+      const zoneEntries = analyticsData.zone_timeline || [];
+      setZoneTimeline({
+        time: zoneEntries.map(entry => entry.time),
+        zones: Object.fromEntries(ZONE_NAMES.map(name => [name, zoneEntries.map(entry => entry.zones[name])]))
+      });
+    }
   }, [sessionName]);
 
   useEffect(() => {
@@ -197,27 +241,61 @@ function PlaybackView({ sessionName, onBack }) {
         </div>
       </div>
 
-      {analytics && <AnalyticsPanel analytics={analytics} currentTime={currentTime} />}
+      {analytics && (
+        <AnalyticsPanel
+          analytics={analytics}
+          timeline={timeline}
+          zoneTimeline={zoneTimeline}
+          currentTime={currentTime}
+        />
+      )}
     </div>
   );
 }
 
-function AnalyticsPanel({ analytics, currentTime }) {
-  const { intensity, repetition, hot_zones, timeline, zone_timeline, duration_seconds } = analytics;
+function graphLevel(header) {
+  // Finest level that still fits the graph.
+  if (header.length <= GRAPH_MAX_POINTS) return 0;
+  const index = header.levels.findIndex(level => level.length <= GRAPH_MAX_POINTS);
+  return index === -1 ? header.levels.length : index + 1;
+}
+
+function toGraphSeries(result) {
+  if (!result) return null;
+  const { columns } = result;
+  if (result.level === 0) {
+    return { time: columns.time, min: columns.intensity, max: columns.intensity };
+  }
+  return { time: columns.time, min: columns.intensity_min, max: columns.intensity_max };
+}
+
+function lastIndexAtOrBefore(times, t) {
+  let lo = 0;
+  let hi = times.length - 1;
+  let found = -1;
+  while (lo <= hi) {
+    const mid = (lo + hi) >> 1;
+    if (times[mid] <= t) {
+      found = mid;
+      lo = mid + 1;
+    } else {
+      hi = mid - 1;
+    }
+  }
+  return found;
+}
+
+function AnalyticsPanel({ analytics, timeline, zoneTimeline, currentTime }) {
+  const { intensity, repetition, hot_zones, duration_seconds } = analytics;
 
   const currentZones = React.useMemo(() => {
-    if (!zone_timeline || zone_timeline.length === 0) return hot_zones;
+    if (!zoneTimeline || zoneTimeline.time.length === 0) return hot_zones;
     
-    let closest = zone_timeline[0];
-    for (const entry of zone_timeline) {
-      if (entry.time <= currentTime) {
-        closest = entry;
-      } else {
-        break;
-      }
-    }
-    return closest?.zones || hot_zones;
-  }, [zone_timeline, currentTime, hot_zones]);
+    const index = Math.max(0, lastIndexAtOrBefore(zoneTimeline.time, currentTime));
+    return Object.fromEntries(
+      Object.entries(zoneTimeline.zones).map(([name, values]) => [name, values[index]])
+    );
+  }, [zoneTimeline, currentTime, hot_zones]);
 
   return (
     <div className="bg-surface-800 rounded-lg border border-surface-600 p-6">
@@ -284,17 +362,21 @@ function StatCard({ label, value, subtext }) {
 }
 
 function IntensityGraph({ timeline, currentTime, duration }) {
-  if (!timeline || timeline.length === 0) {
+  if (!timeline || timeline.time.length === 0) {
     return <div className="h-32 bg-surface-700 rounded flex items-center justify-center text-gray-500 text-sm">Sem dados</div>;
   }
 
-  const maxIntensity = Math.max(...timeline.map(p => p.intensity), 1);
+  let maxIntensity = 1;
+  for (const value of timeline.max) {
+    if (value > maxIntensity) maxIntensity = value;
+  }
   const width = 100;
   const height = 32;
   
-  const points = timeline.map((point, i) => {
-    const x = (point.time / duration) * width;
-    const y = height - (point.intensity / maxIntensity) * height;
+  // Upper envelope of each bin (the samples themselves at full resolution).
+  const points = Array.from(timeline.time, (time, i) => {
+    const x = (time / duration) * width;
+    const y = height - (timeline.max[i] / maxIntensity) * height;
     return `${x},${y}`;
   }).join(' ');
 
@@ -4,6 +4,7 @@ function RecordView({ onComplete }) {
   const videoRef = useRef(null);
   const mediaRecorderRef = useRef(null);
   const chunksRef = useRef([]);
+  const startTimeRef = useRef(0);
   
   const [isRecording, setIsRecording] = useState(false);
   const [elapsedTime, setElapsedTime] = useState(0);
@@ -68,6 +69,7 @@ function RecordView({ onComplete }) {
     
     mediaRecorderRef.current = mediaRecorder;
     mediaRecorder.start(1000);
+    startTimeRef.current = Date.now();
     
     setIsRecording(true);
     setElapsedTime(0);
@@ -84,12 +86,15 @@ function RecordView({ onComplete }) {
     const blob = new Blob(chunksRef.current, { type: 'video/webm' });
     const arrayBuffer = await blob.arrayBuffer();
     const videoData = new Uint8Array(arrayBuffer);
+    // MediaRecorder leaves the WebM duration empty; the worker uses this to
+    // estimate the frame count without decoding the whole file first.
+    const durationSeconds = (Date.now() - startTimeRef.current) / 1000;
     
     const now = new Date();
     const sessionName = now.toISOString().replace(/[:.]/g, '-').slice(0, 19);
     
     try {
-      window.api.createSession(sessionName, videoData, null);
+      window.api.createSession(sessionName, videoData, null, durationSeconds);
       onComplete();
     } catch (err) {
       console.error('Failed to save recording:', err);
@@ -5,10 +5,11 @@ function SessionsView({ onOpenPlayback }) {
 
   const loadSessions = () => {
     const sessionList = window.api.listSessions();
-    const sessionsWithJobs = sessionList.map(name => ({
-      name,
-      job: window.api.readJob(name) || { status: 'pending', processed_frames: 0, total_frames: 0 },
-    }));
+    const sessionsWithJobs = sessionList.map(name => {
+      const job = window.api.readJob(name) || { status: 'pending', processed_frames: 0, total_frames: 0 };
+      const analytics = job.status === 'processing' ? window.api.readAnalytics(name) : null;
+      return { name, job, analytics };
+    });
     setSessions(sessionsWithJobs);
   };
 
@@ -47,11 +48,12 @@ function SessionsView({ onOpenPlayback }) {
 
       {sessions.length > 0 ? (
         <div className="space-y-3">
-          {sessions.map(({ name, job }) => (
+          {sessions.map(({ name, job, analytics }) => (
             <SessionCard
               key={name}
               name={name}
               job={job}
+              analytics={analytics}
               displayName={formatDate(name)}
               onClick={() => onOpenPlayback(name)}
             />
@@ -66,7 +68,7 @@ function SessionsView({ onOpenPlayback }) {
   );
 }
 
-function SessionCard({ name, job, displayName, onClick }) {
+function SessionCard({ name, job, analytics, displayName, onClick }) {
   const badgeClass = {
     pending: 'badge-pending',
     processing: 'badge-processing',
@@ -86,13 +88,34 @@ function SessionCard({ name, job, displayName, onClick }) {
     : 0;
 
   const showProgress = job.status === 'processing' && job.total_frames > 0;
+  const liveCycles = analytics?.partial ? analytics.repetition?.cycles_per_minute : null;
+  // Live sessions (worker.py --live) have no frame total; the worker keeps
+  // live.jpg updated with the current heatmap instead.
+  const isLive = job.live && job.status === 'processing';
+  const previewPath = isLive ? window.api.getSessionFile(name, 'live.jpg') : null;
+  const showPreview = previewPath && window.api.fileExists(previewPath);
 
   return (
     <div className="session-card" onClick={onClick}>
       <div className="flex items-center justify-between mb-2">
         <span className="text-sm font-medium">{displayName}</span>
-        <span className={`badge ${badgeClass}`}>{statusText}</span>
+        <span className={`badge ${badgeClass}`}>{isLive ? 'Ao vivo' : statusText}</span>
       </div>
+      {isLive && (
+        <>
+          {showPreview && (
+            <img
+              src={`file://${previewPath}?t=${job.processed_frames}`}
+              alt="Mapa de calor ao vivo"
+              className="w-48 rounded mb-1"
+            />
+          )}
+          <p className="text-xs text-gray-500">
+            {job.processed_frames} quadros
+            {liveCycles != null && ` · ~${liveCycles} ciclos/min até agora`}
+          </p>
+        </>
+      )}
       {showProgress && (
         <>
           <div className="progress-bar">
@@ -100,6 +123,7 @@ function SessionCard({ name, job, displayName, onClick }) {
           </div>
           <p className="text-xs text-gray-500 mt-1">
             {job.processed_frames} / {job.total_frames} quadros ({progress}%)
+            {liveCycles != null && ` · ~${liveCycles} ciclos/min até agora`}
           </p>
         </>
       )}
@@ -0,0 +1,11 @@
+"""
+FPGA Link
+Serial transport, Sobel result cache and atomic file writes shared by the
+AFTER worker (after-app/python/worker.py) and the pipeline-sobel-fpga
+prototype (pipeline-sobel-fpga/src/main.py).
+"""
+
+from .serial_link import (SerialLink, FRAME_WIDTH, FRAME_HEIGHT, FRAME_SIZE, BAUD_RATE,
+                          DEFAULT_TIMEOUT, RX_RING_FRAMES)
+from .frame_cache import FrameCache, CACHE_MAX_ENTRIES
+from .atomic_file import atomic_write, write_json_atomic
@@ -0,0 +1,32 @@
+"""
+Atomic File
+Whole-file rewrites that readers never see half done: the content goes to a
+temporary file next to the target, which is then renamed over it.
+"""
+
+import os
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_write(path, mode='wb', tmp_suffix='.tmp'):
+    """Open a temporary file next to `path`; it replaces `path` when the block
+    exits normally and is removed if the block raises. Writers that may run
+    concurrently need a distinct `tmp_suffix` each (e.g. with the pid)."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + tmp_suffix)
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(path, data):
+    """Write JSON next to `path` and rename it over, so readers never see half a file."""
+    with atomic_write(path, 'w') as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,129 @@
+"""
+Frame Cache
+LRU cache of Sobel results keyed by a hash of the 160x120 input frame, so that
+byte-identical frames (static stretches of a recording) skip the UART round trip.
+
+Several processes may share one cache file (worker.py --jobs): save() holds a
+lock file, merges in what the others saved meanwhile and renames its own
+temporary file over the cache.
+
+Used by the AFTER worker and the pipeline-sobel-fpga prototype (--role duplex).
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from .serial_link import FRAME_SIZE
+from .atomic_file import atomic_write
+
+KEY_SIZE = 16
+CACHE_MAX_ENTRIES = 2048  # ~40 MB of results
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on `path` (created if missing) across processes."""
+    with open(path, 'a+b') as f:
+        try:
+            import fcntl
+        except ImportError:
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read_entries(path):
+    """(key, result) records of a cache file, oldest first."""
+    record = KEY_SIZE + FRAME_SIZE
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [(data[offset:offset + KEY_SIZE], data[offset + KEY_SIZE:offset + record])
+            for offset in range(0, len(data) - record + 1, record)]
+
+
+class FrameCache:
+    """Hash-keyed LRU of Sobel results, optionally persisted to a single file."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, path=None):
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    @staticmethod
+    def key(frame_bytes):
+        return hashlib.blake2b(frame_bytes, digest_size=KEY_SIZE).digest()
+
+    def get(self, frame_bytes):
+        """Cached result for an input frame, or None. Counts the hit/miss."""
+        key = self.key(frame_bytes)
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, frame_bytes, result):
+        key = self.key(frame_bytes)
+        with self.lock:
+            self.entries[key] = bytes(result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def load(self):
+        """Read a cache file written by save(), oldest entry first."""
+        entries = _read_entries(self.path)
+        with self.lock:
+            self.entries.update(entries)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        print(f"Frame cache: loaded {len(self.entries)} entries from {self.path}")
+
+    def save(self):
+        """Merge the cache into its file atomically. No-op without a path.
+
+        Entries other processes saved since are kept (as older than ours, and
+        picked up by this cache too); the write goes to a per-process temp
+        file renamed over the cache while the lock file is held.
+        """
+        if self.path is None:
+            return
+        with _file_lock(self.path.with_name(self.path.name + '.lock')):
+            saved = _read_entries(self.path) if self.path.exists() else []
+            with self.lock:
+                merged = OrderedDict((key, result) for key, result in saved if key not in self.entries)
+                merged.update(self.entries)
+                while len(merged) > self.max_entries:
+                    merged.popitem(last=False)
+                self.entries = merged
+                with atomic_write(self.path, tmp_suffix=f".{os.getpid()}.tmp") as f:
+                    for key, result in merged.items():
+                        f.write(key)
+                        f.write(result)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,283 @@
+"""
+Serial Link
+asyncio transport for the DE10-Lite Sobel board: 19,200-byte 160x120
+grayscale frames out, the same size Sobel frames back.
+
+The port's file descriptor is registered with the event loop (add_reader /
+add_writer), so no thread polls it: bytes are read straight into a
+preallocated ring of RX_RING_FRAMES frames when the kernel reports them, and
+receive_frame() awaits a future that the reader resolves once a whole frame
+is buffered. Many links (boards) can share one loop.
+
+Needs a selectable descriptor, i.e. a POSIX serial port or pty. termios is
+only imported once a link drains, so importing the package works everywhere.
+"""
+
+import os
+import time
+import asyncio
+
+import serial
+
+FRAME_WIDTH, FRAME_HEIGHT = 160, 120
+FRAME_SIZE = FRAME_WIDTH * FRAME_HEIGHT
+BAUD_RATE = 115200
+DEFAULT_TIMEOUT = 5.0
+RX_RING_FRAMES = 4
+
+# Stream resynchronization: zero-byte probe size and the silence that marks
+# the end of a board transmission.
+RESYNC_CHUNK = 64
+RESYNC_QUIET = 0.2
+
+
+class _NoMetrics:
+    enabled = False
+
+    def observe(self, stage, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+class SerialLink:
+    """One board on one serial port. Create it from a coroutine on the loop
+    that will drive it.
+
+    Frames are returned as memoryviews into the ring, valid until the next
+    receive_frame() or clear_buffer() call. `async for frame in link` yields
+    frames as they arrive until the link is closed.
+
+    While a session's metrics are attached (self.metrics, anything with
+    enabled/observe/count such as worker_metrics.SessionMetrics), each
+    exchange is split into tx (until the frame has left the port),
+    board_wait (until the first byte of the answer) and rx (until the answer
+    is complete).
+    """
+
+    def __init__(self, port, baud=BAUD_RATE):
+        self.port = port
+        self.baud = baud
+        self.loop = asyncio.get_running_loop()
+        self.ser = serial.Serial(port, baud, timeout=0)
+        self.fd = self.ser.fileno()
+        os.set_blocking(self.fd, False)
+        self.img_size = FRAME_SIZE
+
+        self.capacity = self.img_size * RX_RING_FRAMES
+        self.ring = bytearray(self.capacity)
+        self.ring_view = memoryview(self.ring)
+        self.wrap_frame = bytearray(self.img_size)
+        self.head = 0           # total bytes written by the reader
+        self.tail = 0           # total bytes handed out to the consumer
+        self.holding = False    # last returned frame is still in use
+        self.overrun_bytes = 0  # bytes discarded because the ring was full
+        self.closed = False
+        self.error = None
+        self.waiters = []       # (predicate, future) resolved by the reader
+
+        self.metrics = _NoMetrics()
+        self.sent_at = None     # perf_counter() when the last frame finished sending
+        self.rx_started = None  # perf_counter() when its answer started arriving
+
+        self.loop.add_reader(self.fd, self._on_readable)
+
+    def _on_readable(self):
+        floor = self.tail - self.img_size if self.holding else self.tail
+        free = self.capacity - (self.head - floor)
+        start = self.head % self.capacity
+        try:
+            if free == 0:
+                # Nobody is consuming; drop what arrived rather than spin on the fd.
+                self.overrun_bytes += len(os.read(self.fd, 4096))
+                return
+            n = os.readv(self.fd, [self.ring_view[start:start + min(free, self.capacity - start)]])
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(e)
+            return
+        if n == 0:
+            self._fail(EOFError("port closed"))
+            return
+
+        if self.rx_started is None:
+            self.rx_started = time.perf_counter()
+        self.head += n
+        self._wake()
+
+    def _fail(self, error):
+        print(f"Serial error on {self.port}: {error}")
+        self.error = error
+        self.loop.remove_reader(self.fd)
+        self._wake()
+
+    def _wake(self):
+        for predicate, future in self.waiters:
+            if not future.done() and (predicate() or self.closed or self.error is not None):
+                future.set_result(None)
+
+    async def _wait_for(self, predicate, timeout):
+        """Wait until predicate() holds. Returns False on timeout or if the link died."""
+        if predicate():
+            return True
+        if self.closed or self.error is not None:
+            return False
+        future = self.loop.create_future()
+        waiter = (predicate, future)
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiters.remove(waiter)
+        return predicate()
+
+    async def _write(self, data):
+        # Flat byte view: a partial write must resume at a byte offset, also for
+        # multi-dimensional buffers such as NumPy frames.
+        view = memoryview(data).cast('B')
+        while view:
+            try:
+                n = os.write(self.fd, view)
+            except BlockingIOError:
+                n = 0
+            view = view[n:]
+            if view:
+                writable = self.loop.create_future()
+                self.loop.add_writer(self.fd, lambda: writable.done() or writable.set_result(None))
+                try:
+                    await writable
+                finally:
+                    self.loop.remove_writer(self.fd)
+
+    async def send_frame(self, frame_bytes):
+        """Send a frame (returns once it is in the driver's buffer)."""
+        metrics = self.metrics
+        if not metrics.enabled:
+            await self._write(frame_bytes)
+            return
+        start = time.perf_counter()
+        self.rx_started = None
+        await self._write(frame_bytes)
+        # Wait for the driver to drain so tx is wire time, not a buffer copy.
+        await self.drain()
+        self.sent_at = time.perf_counter()
+        metrics.observe('tx', self.sent_at - start)
+        metrics.count('serial_tx_bytes', memoryview(frame_bytes).nbytes)
+
+    async def drain(self):
+        """Wait until everything written has left the port."""
+        import termios
+        await self.loop.run_in_executor(None, termios.tcdrain, self.fd)
+
+    async def receive_frame(self, timeout=DEFAULT_TIMEOUT):
+        """Wait for a complete frame. Returns a memoryview, or None on timeout
+        (or once the link is closed); timeout=None waits indefinitely."""
+        self.holding = False
+        if not await self._wait_for(lambda: self.head - self.tail >= self.img_size, timeout):
+            self.metrics.count('timeouts')
+            return None
+        if self.metrics.enabled:
+            self._observe_exchange()
+        start = self.tail % self.capacity
+        self.tail += self.img_size
+        self.holding = True
+        if start + self.img_size <= self.capacity:
+            return self.ring_view[start:start + self.img_size]
+        # Stray bytes shifted the stream off the slot boundary and this
+        # frame wraps around the end of the ring; stitch it together.
+        first = self.capacity - start
+        self.wrap_frame[:first] = self.ring_view[start:]
+        self.wrap_frame[first:] = self.ring_view[:self.img_size - first]
+        return memoryview(self.wrap_frame)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        frame = await self.receive_frame(timeout=None)
+        if frame is None:
+            raise StopAsyncIteration
+        return frame
+
+    def _observe_exchange(self):
+        """Record board_wait/rx of the frame just completed."""
+        now = time.perf_counter()
+        if self.sent_at is not None and self.rx_started is not None:
+            self.metrics.observe('board_wait', max(0.0, self.rx_started - self.sent_at))
+            self.metrics.observe('rx', now - max(self.rx_started, self.sent_at))
+        self.metrics.count('serial_rx_bytes', self.img_size)
+        self.sent_at = None
+
+    def clear_buffer(self):
+        """Drop any buffered bytes, including a partial frame."""
+        self.tail = self.head
+        self.holding = False
+
+    async def has_stray_bytes(self, settle_bytes=2):
+        """After a frame, wait a couple of byte times and report anything extra.
+
+        The board sends exactly one frame per request, so a trailing byte means
+        a duplicated or stray byte shifted the frame just received.
+        """
+        await asyncio.sleep(settle_bytes * 10 / self.baud)
+        return self.head != self.tail
+
+    def pending_bytes(self):
+        """Copy of the bytes received but not yet handed out."""
+        count = self.head - self.tail
+        start = self.tail % self.capacity
+        first = min(count, self.capacity - start)
+        return bytes(self.ring_view[start:start + first]) + bytes(self.ring_view[:count - first])
+
+    async def resync(self, timeout=DEFAULT_TIMEOUT):
+        """Bring the board back to an empty receive state after a desync.
+
+        Waits out any transmission in progress, then feeds zero bytes until
+        the board completes whatever partial frame it holds and answers; the
+        answer is drained. Returns False if the board never answers.
+        """
+        self.metrics.count('resyncs')
+        await self._wait_quiet()
+        self.clear_buffer()
+
+        probe = bytes(RESYNC_CHUNK)
+        # Time for a probe chunk to reach the board and for processing to start.
+        settle = RESYNC_CHUNK * 10 / self.baud + 0.005
+        sent = 0
+        answered = False
+        while sent < self.img_size and not answered:
+            n = min(RESYNC_CHUNK, self.img_size - sent)
+            await self._write(probe[:n])
+            await self.drain()
+            sent += n
+            answered = await self._wait_bytes(settle)
+
+        if not answered and not await self._wait_bytes(timeout):
+            return False
+        await self._wait_quiet()
+        self.clear_buffer()
+        return True
+
+    async def _wait_bytes(self, timeout):
+        return await self._wait_for(lambda: self.head != self.tail, timeout)
+
+    async def _wait_quiet(self, quiet=RESYNC_QUIET):
+        while True:
+            head = self.head
+            await asyncio.sleep(quiet)
+            if self.head == head:
+                return
+
+    def close(self):
+        """Unregister from the loop and close the port; pending receives return None."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.error is None:
+            self.loop.remove_reader(self.fd)
+        self._wake()
+        self.ser.close()
@@ -0,0 +1,60 @@
+"""
+Frame Store
+Append-only container for a stream of raw 8-bit grayscale frames, in place
+of a folder with one PNG per frame.
+
+Layout: b'SBFR', uint16 width, uint16 height (little-endian), then the frames
+back to back, width*height bytes each. The frame count follows from the file
+size, so a writer that dies mid-stream leaves a readable file (a trailing
+partial frame is ignored).
+"""
+
+import os
+import struct
+import numpy as np
+
+MAGIC = b'SBFR'
+HEADER = struct.Struct('<4sHH')
+
+
+class FrameStore:
+    """Writes frames to a new store file; use as a context manager or close()."""
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.frame_size = width * height
+        self.count = 0
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, width, height))
+
+    def append(self, frame):
+        """Append one frame (bytes, memoryview or uint8 array of width*height)."""
+        data = memoryview(frame).cast('B')
+        if len(data) != self.frame_size:
+            raise ValueError(f"Expected {self.frame_size} bytes, got {len(data)}")
+        self.file.write(data)
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def load_frames(path):
+    """Memory-map a store as a read-only (count, height, width) uint8 array."""
+    with open(path, 'rb') as f:
+        magic, width, height = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a frame store")
+    count = (os.path.getsize(path) - HEADER.size) // (width * height)
+    if count == 0:
+        return np.zeros((0, height, width), dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER.size, shape=(count, height, width))
@@ -0,0 +1,74 @@
+"""
+Frame Writer
+Saves received frames as PNGs on a small pool of background threads, fed by
+a bounded queue, so PNG encoding and slow disks never hold up the serial
+reader.
+"""
+
+import queue
+import asyncio
+import threading
+import img_utils
+
+WRITER_THREADS = 2
+WRITER_QUEUE_FRAMES = 64  # ~1.2 MB of raw frames waiting for the disk
+
+_END = object()
+
+
+class FrameWriterPool:
+    """img_utils.save_frame() on worker threads; use as a context manager or close()."""
+
+    def __init__(self, folder, workers=WRITER_THREADS, queue_size=WRITER_QUEUE_FRAMES):
+        self.folder = folder
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.error = None
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._write, name=f"frame-writer-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    async def put(self, data, index):
+        """Queue a frame (bytes, copied from the link) for saving as frame number index.
+
+        Only waits, on a thread, when the writers are a full queue behind.
+        """
+        if self.error is not None:
+            raise RuntimeError(f"frame writer failed: {self.error}")
+        try:
+            self.queue.put_nowait((data, index))
+        except queue.Full:
+            await asyncio.to_thread(self.queue.put, (data, index))
+
+    def _write(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            if self.error is not None:
+                continue  # keep draining so put() never blocks forever
+            data, index = item
+            try:
+                img_utils.save_frame(data, index, self.folder)
+            except Exception as e:
+                self.error = e
+                continue
+            with self.lock:
+                self.written += 1
+
+    def close(self):
+        """Write everything queued, then stop the threads."""
+        for _ in self.threads:
+            self.queue.put(_END)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -1,112 +1,174 @@
 import argparse
-import time
+import asyncio
 import os
 import sys
+import glob
 import serial.tools.list_ports
-from transceiver import SerialTransceiver
 import video_utils
 import img_utils
+from frame_store import FrameStore
+from frame_writer import FrameWriterPool
+from send_pacer import SendPacer
 from tqdm import tqdm
 
+# fpga_link/, shared with the AFTER worker, lives at the repository root.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from fpga_link import SerialLink, FrameCache, CACHE_MAX_ENTRIES
+
 # --- Configuration ---
 TEMP_VIDEO = "temp_capture.avi"
 TX_FRAMES_DIR = "tx_frames_cache"
 RX_FRAMES_DIR = "rx_frames"
+RX_FRAMES_FILE = "rx_frames.raw"  # duplex: received frames, see frame_store.py
 FINAL_VIDEO = "processed_video.mp4"
+DUPLEX_SKIP_FRAMES = 5
 # ---------------------
 
 def list_ports():
     ports = serial.tools.list_ports.comports()
     return [p.device for p in ports]
 
-def sender_workflow(trx):
+async def send_video_folder(link, folder_path):
+    files = sorted(glob.glob(os.path.join(folder_path, "*.*")))
+    if not files:
+        print("No frames to send.")
+        return
+
+    print(f"Preparing to send {len(files)} frames...")
+    # Each frame goes out as soon as the board can take it (see send_pacer.py).
+    pacer = SendPacer(link)
+    for f in tqdm(files, unit="frame", desc="Transmitting"):
+        try:
+            await pacer.send(img_utils.process_image(f))
+        except Exception as e:
+            print(f"Error sending {f}: {e}")
+    print(f"\nTransmission complete. Link throughput: {pacer.rate:.0f} B/s"
+          f" ({'paced by board answers' if pacer.answered else 'paced by measured throughput'})")
+
+async def sender_workflow(link):
     """Only sends data. Used if you have two distinct computers/FPGAs."""
     video_path = video_utils.capture_from_webcam(TEMP_VIDEO)
     video_utils.video_to_frames(video_path, TX_FRAMES_DIR, skip_frames=1)
     input("Press Enter to start transmission...")
-    trx.send_video_folder(TX_FRAMES_DIR)
+    await send_video_folder(link, TX_FRAMES_DIR)
 
-def receiver_workflow(trx):
+async def receiver_workflow(link):
     """Only receives data. Used if you have two distinct computers/FPGAs."""
     print(f"--- Receiver Mode ---")
     if not os.path.exists(RX_FRAMES_DIR):
         os.makedirs(RX_FRAMES_DIR)
 
-    trx.rx_frame_count = 0
-    trx.rx_video_active = True
-    trx.mode = 'image'
+    frame_count = 0
+    # PNGs are written on background threads so the link keeps draining the port.
+    with FrameWriterPool(RX_FRAMES_DIR) as writer:
+        try:
+            async for frame in link:
+                await writer.put(bytes(frame), frame_count)
+                if frame_count % 5 == 0:
+                    print(".", end="", flush=True)
+                frame_count += 1
+        except asyncio.CancelledError:
+            # Ctrl+C under asyncio.run() cancels the running task.
+            print("\nStopping reception...")
+    video_utils.frames_to_video(RX_FRAMES_DIR, FINAL_VIDEO, fps=6)
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\nStopping reception...")
-        trx.rx_video_active = False
-        trx.mode = 'interactive'
-        video_utils.frames_to_video(RX_FRAMES_DIR, FINAL_VIDEO, fps=6)
+async def exchange_frames(link, frames, cache=None):
+    """
+    Sends each frame and yields (index, result) as the board answers; result
+    is None if the board timed out. Results read from the link are views into
+    its receive ring, valid until the next frame is requested.
+    Frames already in the cache are not transmitted.
+    """
+    for i, frame in enumerate(frames):
+        cached = cache.get(frame) if cache is not None else None
+        if cached is not None:
+            yield i, cached
+            continue
 
-def duplex_workflow(trx):
+        # A. Send Frame
+        await link.send_frame(frame)
+
+        # B. Wait for Response (Timeout after 5 seconds)
+        frame_data = await link.receive_frame(timeout=5.0)
+        if frame_data is None:
+            # Drop the partial frame so the next one starts clean
+            link.clear_buffer()
+        elif cache is not None:
+            cache.put(frame, frame_data)
+        yield i, frame_data
+
+async def duplex_workflow(link, cache=None, video_path=None, skip_frames=DUPLEX_SKIP_FRAMES):
     """
     SINGLE DEVICE MODE (PC -> FPGA -> PC).
-    Captures video, sends one frame, waits for response, saves it, repeats.
+    Captures video (or uses video_path), sends one frame, waits for response, saves it, repeats.
+    Frames stream from the decoder to the link to the output video in memory;
+    the received frames are also appended to RX_FRAMES_FILE.
     """
     # 1. Capture
-    video_path = video_utils.capture_from_webcam(TEMP_VIDEO)
-    
-    # 2. Process to frames
-    print("Processing frames...")
-    # Skip frames to reduce total transmission time
-    video_utils.video_to_frames(video_path, TX_FRAMES_DIR, skip_frames=5)
+    if video_path is None:
+        video_path = video_utils.capture_from_webcam(TEMP_VIDEO)
     
-    # 3. Prepare RX folder
-    if not os.path.exists(RX_FRAMES_DIR):
-        os.makedirs(RX_FRAMES_DIR)
-        
-    files = sorted(os.listdir(TX_FRAMES_DIR))
-    tx_files = [os.path.join(TX_FRAMES_DIR, f) for f in files if f.endswith('.png')]
+    # 2. Frames are decoded and converted as they are sent
+    # (skip frames to reduce total transmission time)
+    frames = video_utils.read_frames(video_path, skip_frames=skip_frames)
+    total = video_utils.count_frames(video_path, skip_frames) or None
     
-    print(f"--- Starting Duplex Transmission ({len(tx_files)} frames) ---")
+    print(f"--- Starting Duplex Transmission ({total or '?'} frames) ---")
     print("Pattern: Send Frame -> Wait for FPGA Reply -> Save -> Next Frame")
     
-    trx.mode = 'image' # Ensure we capture incoming bytes to buffer
-    
-    for i, file_path in enumerate(tqdm(tx_files, unit="frame")):
-        # A. Send Frame
-        raw_pixels = img_utils.process_image(file_path)
-        trx.send_raw_byte_array(raw_pixels)
-        
-        # B. Wait for Response (Timeout after 5 seconds)
-        start_wait = time.time()
-        while len(trx.img_buffer) < trx.img_size:
-            time.sleep(0.01)
-            if time.time() - start_wait > 5.0:
-                print(f"\n[Timeout] FPGA did not return frame {i} in time.")
-                break
-        
-        # C. Save Received Frame
-        if len(trx.img_buffer) >= trx.img_size:
-            # Extract exactly one frame worth of data
-            frame_data = bytes(trx.img_buffer[:trx.img_size])
-            img_utils.save_frame(frame_data, i, RX_FRAMES_DIR)
-            
-            # Remove that data from buffer
-            trx.img_buffer = trx.img_buffer[trx.img_size:]
-        else:
-            # If we timed out, we still need to clear buffer or skip
-            print("Skipping save for this frame.")
-            trx.img_buffer = bytearray()
-
-    # 4. Stitch Video
-    print("\nTransmission complete. Stitching video...")
-    video_utils.frames_to_video(RX_FRAMES_DIR, FINAL_VIDEO, fps=6)
+    sink = video_utils.VideoSink(FINAL_VIDEO, fps=6)
+    try:
+        with FrameStore(RX_FRAMES_FILE, img_utils.WIDTH, img_utils.HEIGHT) as store:
+            async for i, frame_data in exchange_frames(link, tqdm(frames, total=total, unit="frame"), cache):
+                # C. Save Received Frame
+                if frame_data is None:
+                    print(f"\n[Timeout] FPGA did not return frame {i} in time.")
+                    print("Skipping save for this frame.")
+                    continue
+                store.append(frame_data)
+                sink.write(frame_data)
+    finally:
+        sink.release()
+
+    if cache is not None:
+        print(f"\nFrame cache: {cache.hits} hits, {cache.misses} misses")
+        cache.save()
+
+    print(f"\nTransmission complete. {store.count} frames saved to {RX_FRAMES_FILE}")
     print(f"Done! Output saved to: {FINAL_VIDEO}")
 
+async def run(args, port):
+    print(f"Opening {port}...")
+    try:
+        link = SerialLink(port, args.baud)
+    except Exception as e:
+        print(f"\n[Error] Could not open serial port {port}.")
+        print("Hint: Only ONE program can use the port at a time.")
+        return
+
+    try:
+        if args.role == 'duplex':
+            cache = FrameCache(args.cache_size, args.cache_file) if args.cache_size > 0 else None
+            await duplex_workflow(link, cache, args.video, args.skip_frames)
+        elif args.role == 'sender':
+            await sender_workflow(link)
+        elif args.role == 'receiver':
+            await receiver_workflow(link)
+    finally:
+        link.close()
+
 def main():
     parser = argparse.ArgumentParser(description="Serial Video Transceiver")
     parser.add_argument("--port", help="Serial port")
     parser.add_argument("--baud", type=int, default=115200)
     parser.add_argument("--role", choices=['sender', 'receiver', 'duplex'], required=True, 
                         help="'duplex' is for single-PC (Loopback/FPGA) testing.")
+    parser.add_argument("--cache-size", type=int, default=CACHE_MAX_ENTRIES,
+                        help="Sobel results kept for identical input frames (0 disables).")
+    parser.add_argument("--cache-file", help="Persist the frame cache to this file.")
+    parser.add_argument("--video", help="Use this video file instead of recording from the webcam.")
+    parser.add_argument("--skip-frames", type=int, default=DUPLEX_SKIP_FRAMES,
+                        help="Duplex: send only every Nth frame of the video.")
 
     args = parser.parse_args()
     
@@ -118,22 +180,10 @@ def main():
             return
         port = avail[0]
 
-    print(f"Opening {port}...")
     try:
-        trx = SerialTransceiver(port, args.baud)
-    except Exception as e:
-        print(f"\n[Error] Could not open serial port {port}.")
-        print("Hint: Only ONE program can use the port at a time.")
-        return
-
-    try:
-        if args.role == 'duplex':
-            duplex_workflow(trx)
-            
+        asyncio.run(run(args, port))
     except KeyboardInterrupt:
         print("\nExiting...")
-    finally:
-        trx.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
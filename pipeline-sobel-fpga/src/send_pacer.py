@@ -0,0 +1,65 @@
+"""
+Send Pacer
+Paces a sender that streams frames to the board without a receiver of its
+own in the loop (--role sender).
+
+The board only listens while it is not transmitting (receive -> process ->
+transmit), so the next frame may go out once the previous answer has left
+the board. If the answers come back on the sender's own port they are used
+directly as flow control. Otherwise the sender waits the time the board
+needs to transmit one answer, computed from the throughput measured while
+sending (answers travel at the same rate as requests).
+"""
+
+import time
+
+# Time the board takes between the last request byte and the first answer
+# byte, plus scheduling slack on the host.
+BOARD_TURNAROUND = 0.005
+# Extra fraction of an answer's transmit time waited when pacing blind.
+PACING_MARGIN = 0.05
+# How long to wait for an answer once the board is known to answer here.
+ANSWER_TIMEOUT = 5.0
+# Weight of the newest measurement in the throughput average.
+RATE_SMOOTHING = 0.3
+
+
+class SendPacer:
+    """Sends frames on a link, each once the board is ready for it."""
+
+    def __init__(self, link, margin=PACING_MARGIN):
+        self.link = link
+        self.margin = margin
+        self.rate = link.baud / 10  # bytes/s at 8N1, until measured
+        self.answered = False  # the board's answers reach this port
+        self.sent = 0
+        self.answers = 0
+
+    async def send(self, frame):
+        """Send a frame and wait until the board can take the next one."""
+        size = memoryview(frame).nbytes
+        start = time.perf_counter()
+        await self.link.send_frame(frame)
+        await self.link.drain()
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            measured = size / elapsed
+            self.rate += RATE_SMOOTHING * (measured - self.rate)
+        self.sent += 1
+        await self._wait_board(size)
+
+    def answer_time(self, size):
+        """Expected time from a request leaving the port to its answer being complete."""
+        return size / self.rate * (1 + self.margin) + BOARD_TURNAROUND
+
+    async def _wait_board(self, size):
+        # Until an answer has been seen, waiting one answer time for it is
+        # also exactly the blind pacing interval.
+        timeout = ANSWER_TIMEOUT if self.answered else self.answer_time(size)
+        answer = await self.link.receive_frame(timeout=timeout)
+        if answer is not None:
+            self.answered = True
+            self.answers += 1
+        elif self.answered:
+            # The board lost this frame; drop any partial answer.
+            self.link.clear_buffer()
@@ -2,6 +2,7 @@ import cv2
 import os
 import shutil
 import glob
+import numpy as np
 from PIL import Image
 
 def capture_from_webcam(output_path="temp_recording.avi", width=640, height=480):
@@ -42,6 +43,65 @@ def capture_from_webcam(output_path="temp_recording.avi", width=640, height=480)
     print("Recording saved.")
     return output_path
 
+def to_fpga_frame(frame, target_size=(160, 120)):
+    """BGR frame -> resized grayscale uint8 array, as the FPGA expects it."""
+    frame = cv2.resize(frame, target_size)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def read_frames(video_path, target_size=(160, 120), skip_frames=1):
+    """
+    Yields every skip_frames-th frame of a video as a grayscale uint8 array,
+    decoded and converted in memory.
+    """
+    cap = cv2.VideoCapture(video_path)
+    index = 0
+    try:
+        while True:
+            if index % skip_frames:
+                # Skipped frames are only demuxed/decoded, never converted.
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield to_fpga_frame(frame, target_size)
+            index += 1
+    finally:
+        cap.release()
+
+def count_frames(video_path, skip_frames=1):
+    """Frames read_frames() will yield, per the container (0 if unknown)."""
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return max(0, (total + skip_frames - 1) // skip_frames)
+
+class VideoSink:
+    """
+    cv2.VideoWriter fed with grayscale frames (arrays or raw bytes), opened
+    on the first frame.
+    """
+    def __init__(self, output_path, fps=30, size=(160, 120)):
+        self.output_path = output_path
+        self.fps = fps
+        self.size = size
+        self.video = None
+        self.count = 0
+
+    def write(self, frame):
+        width, height = self.size
+        gray = np.frombuffer(frame, dtype=np.uint8).reshape(height, width)
+        if self.video is None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self.video = cv2.VideoWriter(self.output_path, fourcc, self.fps, self.size)
+        self.video.write(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+        self.count += 1
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+
 def video_to_frames(video_path, output_folder, target_size=(160, 120), skip_frames=5):
     """
     Reads video, resizes, converts to grayscale, and saves frames.
@@ -51,30 +111,15 @@ def video_to_frames(video_path, output_folder, target_size=(160, 120), skip_fram
         shutil.rmtree(output_folder)
     os.makedirs(output_folder)
 
-    cap = cv2.VideoCapture(video_path)
-    count = 0
     saved_count = 0
     
     print("Processing video for transmission...")
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Resize
-        frame = cv2.resize(frame, target_size)
-        # Convert to Grayscale
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Save using PIL logic (so it matches your existing img_utils)
-        # Or just save using cv2
+    for frame in read_frames(video_path, target_size, skip_frames):
         filename = os.path.join(output_folder, f"frame_{saved_count:04d}.png")
         cv2.imwrite(filename, frame)
         saved_count += 1
-            
 
-    cap.release()
     print(f"Extracted {saved_count} frames to {output_folder}")
     return saved_count
 